@@ -1,4 +1,10 @@
 from .tools import TOOLS_REGISTRY, resolve_tools, tool_register
+from .menu_digest import MenuDigest, menu_digest
+from .model_routing import ModelProfile, ModelRouter, model_router
+from .prefetch import Prefetcher, prefetcher
+from .response_cache import ResponseCache, response_cache
+from .tool_cache import ToolResultCache, tool_cache
+from .scheduler import ModelCallScheduler, SchedulerSaturated, model_scheduler
 from .beauty_pizza_agent import BeautyPizzaAgent
 
-__all__ = ['TOOLS_REGISTRY', 'resolve_tools', 'tool_register', 'BeautyPizzaAgent']
\ No newline at end of file
+__all__ = ['TOOLS_REGISTRY', 'resolve_tools', 'tool_register', 'MenuDigest', 'menu_digest', 'ModelProfile', 'ModelRouter', 'model_router', 'Prefetcher', 'prefetcher', 'ResponseCache', 'response_cache', 'ToolResultCache', 'tool_cache', 'ModelCallScheduler', 'SchedulerSaturated', 'model_scheduler', 'BeautyPizzaAgent']
\ No newline at end of file
@@ -1,7 +1,24 @@
+import contextvars
+import copy
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from textwrap import dedent
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
-from .tools import resolve_tools
+from utils import event_logger, turn_profiler
+from utils.deadline import DeadlineExceeded, deadline_scope, record_deadline_miss
+from utils.extraction import CAMPOS_ENDERECO, customer_fields, extract_customer_data, missing_fields
+from .menu_digest import menu_digest
+from .model_routing import ModelProfile, model_router
+from .prefetch import prefetcher
+from .response_cache import response_cache
+from .scheduler import model_scheduler, SchedulerSaturated
+from .tool_cache import tool_session
+from .tools import resolve_tools, order_outbox, knowledge_base, order_api, load_pizza_info, load_order
 
 
 class BeautyPizzaAgent:
@@ -12,12 +29,44 @@ class BeautyPizzaAgent:
     ESTADO_CRIANDO_PEDIDO = "criando_pedido"  
     ESTADO_FINALIZADO = "finalizado"
     
-    def __init__(self, openai_api_key: str):
-        self.model = OpenAIChat(
-            id="gpt-4o-mini",
-            api_key=openai_api_key,
-            temperature=0.7
-        )
+    # O cache de respostas não leva o histórico e só vale na primeira rodada
+    # da sessão, que é sempre no estado inicial: cobre as saudações de abertura
+    ESTADOS_CACHEAVEIS = (ESTADO_INICIAL,)
+    
+    # Folga para histórico e resposta na estimativa de tokens de uma rodada
+    TOKENS_EXTRA_ESTIMADOS = 1500
+    
+    # Estados em que o cliente navega pelo cardápio
+    ESTADOS_NAVEGACAO = (ESTADO_INICIAL, ESTADO_CONSULTANDO_CARDAPIO)
+    
+    # Ferramentas que alteram o pedido na Order API
+    FERRAMENTAS_DE_ESCRITA = ("create_order", "add_pizza_to_order", "update_delivery_address", "remove_item_from_order")
+    
+    RESPOSTA_FALHA_ALTERACAO = "⚠️ Não consegui registrar no pedido #{order_id}: {perdidos}. Quer que eu tente de novo?"
+    
+    RESPOSTA_FALHA_PEDIDO = "⚠️ Não consegui registrar o pedido #{order_id} no nosso sistema. Quer que eu tente criar o pedido de novo?"
+    
+    RESPOSTA_PRAZO_ESGOTADO = "Desculpe a demora! 🍕 Ainda estou verificando isso. Pode me mandar sua mensagem de novo?"
+    
+    def __init__(self, openai_api_key: str, session_id: str = None, preload_menu: bool = None,
+                 turn_timeout: float = None):
+        self.session_id = session_id or uuid.uuid4().hex
+        if turn_timeout is None:
+            turn_timeout = float(os.getenv('TURN_DEADLINE_SECONDS', '25'))
+        self.turn_timeout = turn_timeout or None
+        self._pending_run = None
+        # Rodadas concluídas e trocas que o modelo não viu (cache, respostas locais, avisos)
+        self._turnos = 0
+        self._historico_pendente = []
+        if preload_menu is None:
+            preload_menu = os.getenv('PRELOAD_MENU', '').lower() in ('1', 'true', 'sim')
+        self.preload_menu = preload_menu
+        self._menu_preloaded = False
+        
+        self.openai_api_key = openai_api_key
+        self._models = {}
+        self.model_profile = model_router.profile_for(self.ESTADO_INICIAL)
+        self.model = self._model_for(self.model_profile)
         
         self.available_tools = [
             "get_menu",
@@ -30,11 +79,12 @@ class BeautyPizzaAgent:
             "get_order_items",
             "get_order_total",
             "remove_item_from_order",
+            "quote_cart",
         ]
         
         self.agent = Agent(
             model=self.model,
-            tools=resolve_tools(self.available_tools),
+            tools=resolve_tools(list(self.model_profile.tools) or self.available_tools),
             instructions="",  
             show_tool_calls=False,
             add_history_to_messages=True,  
@@ -50,30 +100,294 @@ class BeautyPizzaAgent:
             "endereco_temporario": None,
             "nome_temporario": None,
             "documento_temporario": None,
+            "resumo_mostrado": False,
             "saudacao_feita": False,
         }
     
     def chat(self, message: str) -> str:
+        trace_id = uuid.uuid4().hex[:16]
+        with event_logger.bind(session_id=self.session_id, trace_id=trace_id), tool_session(self.session_id):
+            with turn_profiler.profile(trace_id, self.session_id):
+                with event_logger.timed("agent.turn") as turn, deadline_scope(self.turn_timeout) as deadline:
+                    response = self._chat(message, deadline)
+                    self._turnos += 1
+                    turn["estado"] = self.conversation_state["estado"]
+                    return response
+    
+    def _chat(self, message: str, deadline=None) -> str:
+        estado_inicial = copy.deepcopy(self.conversation_state)
         try:
-            print(f"[Bella] Estado atual: {self.conversation_state['estado']}")
+            event_logger.debug("agent.turn_start", estado=self.conversation_state["estado"])
             
+            aviso = self._reconcile_order_id()
+            if aviso:
+                return self._reply_without_model(message, aviso)
             self._check_for_existing_order(message)
+            self._prefetch_for_state(message)
+            
+            resposta_local = self._collect_customer_data(message)
+            if resposta_local:
+                return self._reply_without_model(message, resposta_local)
             
             instructions = self._get_dynamic_instructions()
             self.agent.instructions = instructions
+            profile = model_router.profile_for(self.conversation_state["estado"])
             
             enriched_message = self._enrich_with_order_context(message)
+            estado_anterior = self.conversation_state["estado"]
             
-            response = self.agent.run(enriched_message)
+            cache_key = self._response_cache_key(message, enriched_message, instructions)
+            if cache_key:
+                cached = response_cache.get(cache_key)
+                if cached is not None:
+                    event_logger.info("agent.response_cache_hit", estado=estado_anterior)
+                    self._update_state(message, cached)
+                    self._prefetch_after_transition(estado_anterior, message)
+                    return self._reply_without_model(message, cached)
+            
+            priority = 1 if self.conversation_state["estado"] == self.ESTADO_CRIANDO_PEDIDO else 0
+            estimated_tokens = (len(instructions) + len(enriched_message)) // 4 + self.TOKENS_EXTRA_ESTIMADOS
+            
+            timeout = deadline.remaining() if deadline else None
+            ticket = model_scheduler.acquire(self.session_id, estimated_tokens, priority, timeout)
+            started = time.perf_counter()
+            response = self._run_agent(enriched_message, profile, deadline, ticket)
+            elapsed = time.perf_counter() - started
+            model_scheduler.record_usage(ticket, *self._response_usage(response))
+            model_router.record(estado_anterior, profile, elapsed, *self._response_tokens(response))
+            if self._hit_token_limit(response, profile):
+                event_logger.warning("agent.reply_truncated", estado=estado_anterior, max_tokens=profile.max_tokens)
+            
+            if estado_anterior in self.ESTADOS_NAVEGACAO:
+                menu_digest.record_turn(self._menu_preloaded, self._tool_names(response), elapsed)
+            
+            if cache_key and response.content:
+                response_cache.put(cache_key, response.content, elapsed)
             
             self._update_state(message, response.content)
+            aviso = self._reconcile_order_id()
+            self._prefetch_after_transition(estado_anterior, message)
             
+            if aviso:
+                self._historico_pendente.append(("Bella", aviso))
+                return f"{response.content}\n\n{aviso}"
             return response.content
             
+        except DeadlineExceeded as e:
+            # Nada do turno interrompido fica no estado da conversa
+            self.conversation_state = estado_inicial
+            record_deadline_miss(estado_inicial["estado"])
+            event_logger.warning("agent.deadline_exceeded", estado=estado_inicial["estado"], error=str(e))
+            return self._reply_without_model(message, self.RESPOSTA_PRAZO_ESGOTADO)
+            
+        except SchedulerSaturated as e:
+            event_logger.warning("agent.model_call_rejected", error=str(e))
+            return "Estamos com muitos pedidos neste momento! 🍕 Pode me mandar sua mensagem de novo em instantes?"
+            
         except Exception as e:
-            print(f"[Erro] {e}")
+            event_logger.error("agent.turn_error", error=str(e))
             return f"Desculpe, ocorreu um erro. Pode repetir por favor? (Erro: {str(e)})"
     
+    def _model_for(self, profile: ModelProfile) -> OpenAIChat:
+        key = (profile.model_id, profile.max_tokens, profile.temperature)
+        model = self._models.get(key)
+        if model is None:
+            model = OpenAIChat(
+                id=profile.model_id,
+                api_key=self.openai_api_key,
+                temperature=profile.temperature,
+                max_tokens=profile.max_tokens,
+                timeout=self.turn_timeout
+            )
+            self._models[key] = model
+        return model
+    
+    def _apply_model_profile(self, profile: ModelProfile):
+        """Troca modelo e ferramentas do agente pelos do perfil da rodada"""
+        if profile == self.model_profile:
+            return
+        
+        self.model = self._model_for(profile)
+        self.agent.model = self.model
+        if profile.tools != self.model_profile.tools:
+            # set_tools faz o agno preparar de novo as ferramentas na próxima execução
+            self.agent.set_tools(resolve_tools(list(profile.tools) or self.available_tools))
+        
+        event_logger.debug("agent.model_profile", model_id=profile.model_id, tools=len(profile.tools))
+        self.model_profile = profile
+    
+    def _run_agent(self, enriched_message: str, profile: ModelProfile, deadline=None, ticket=None):
+        """Roda o agente respeitando o prazo do turno; ao estourar, cancela e desiste de esperar.
+        
+        A vaga ``ticket`` do agendador só é liberada quando a execução termina de
+        fato, mesmo que o turno já tenha desistido dela. As trocas pendentes vão
+        na frente da mensagem e saem da fila quando o modelo as recebe.
+        """
+        release = (lambda *_: model_scheduler.release(ticket)) if ticket is not None else (lambda *_: None)
+        
+        if deadline is None:
+            try:
+                self._apply_model_profile(profile)
+                pendentes = len(self._historico_pendente)
+                response = self.agent.run(self._with_pending_history(enriched_message))
+                del self._historico_pendente[:pendentes]
+                return response
+            finally:
+                release()
+        
+        try:
+            # Um turno anterior que estourou o prazo pode ainda estar usando o agente
+            # (e, ao terminar, deixa em _historico_pendente a resposta que não foi enviada)
+            if self._pending_run is not None and not self._pending_run.done():
+                try:
+                    self._pending_run.result(timeout=deadline.remaining())
+                except FutureTimeout:
+                    raise DeadlineExceeded("Turno anterior ainda em andamento")
+                except Exception:
+                    pass
+            self._apply_model_profile(profile)
+        except BaseException:
+            release()
+            raise
+        
+        pendentes = len(self._historico_pendente)
+        message = self._with_pending_history(enriched_message)
+        future = Future()
+        future.add_done_callback(release)
+        # Decide, sem corrida com o fim da execução, se o turno desistiu dela
+        abandono = threading.Lock()
+        abandonada = threading.Event()
+        
+        def run():
+            turn_profiler.track_current_thread()
+            try:
+                response = self.agent.run(message)
+            except BaseException as e:
+                future.set_exception(e)
+                return
+            with abandono:
+                del self._historico_pendente[:pendentes]
+                if abandonada.is_set():
+                    self._note_discarded_run(response)
+                future.set_result(response)
+        
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(run,), name="agent-run", daemon=True).start()
+        self._pending_run = future
+        
+        try:
+            response = future.result(timeout=deadline.remaining())
+        except FutureTimeout:
+            with abandono:
+                if not future.done():
+                    abandonada.set()
+                    deadline.cancel()
+                    raise DeadlineExceeded("Tempo do turno esgotado esperando o modelo")
+            response = future.result()
+        
+        # Ferramentas interrompidas pelo prazo encerram a execução com uma resposta incompleta
+        if deadline.expired:
+            self._note_discarded_run(response)
+        deadline.check("execução do agente")
+        return response
+    
+    def _note_discarded_run(self, response):
+        """Registra a resposta de uma execução que o turno descartou pelo prazo.
+        
+        O cliente não a recebeu e o estado da conversa voltou ao do início do
+        turno, mas ela ficou no histórico do agno e as escritas no pedido já
+        foram feitas: o modelo fica sabendo disso na próxima rodada.
+        """
+        escritas = [name for name in self._tool_names(response) if name in self.FERRAMENTAS_DE_ESCRITA]
+        if escritas:
+            event_logger.warning("agent.abandoned_run_wrote", tools=escritas)
+        nota = "(demorou demais e NÃO foi enviada ao cliente"
+        if escritas:
+            nota += f"; estas ferramentas já foram executadas: {', '.join(escritas)}"
+        self._historico_pendente.append(("Sistema", f"A sua última resposta {nota}): {response.content}"))
+    
+    def _response_cache_key(self, message: str, enriched_message: str, instructions: str):
+        """Chave do cache de respostas, ou None se a rodada depende do pedido ou do histórico"""
+        estado = self.conversation_state["estado"]
+        if not response_cache.enabled or estado not in self.ESTADOS_CACHEAVEIS:
+            return None
+        # A chave não leva o histórico: só a primeira rodada da sessão pode usar o cache
+        if self._turnos > 0 or self._historico_pendente:
+            return None
+        if enriched_message != message:
+            return None
+        return response_cache.key(estado, message, instructions, knowledge_base.get_menu_version())
+    
+    @staticmethod
+    def _tool_names(response) -> list:
+        names = []
+        for tool in getattr(response, "tools", None) or []:
+            name = tool.get("tool_name") if isinstance(tool, dict) else getattr(tool, "tool_name", None)
+            if name:
+                names.append(name)
+        return names
+    
+    @staticmethod
+    def _response_usage(response) -> tuple:
+        """Extrai (total de tokens, chamadas ao modelo) das métricas da rodada"""
+        total_tokens = (getattr(response, "metrics", None) or {}).get("total_tokens")
+        if not total_tokens:
+            return None, 1
+        return sum(total_tokens), len(total_tokens)
+    
+    @staticmethod
+    def _hit_token_limit(response, profile: ModelProfile) -> bool:
+        """Se alguma chamada da rodada gerou o máximo de tokens do perfil (resposta provavelmente cortada)"""
+        if not profile.max_tokens:
+            return False
+        saidas = (getattr(response, "metrics", None) or {}).get("output_tokens") or []
+        return any(saida >= profile.max_tokens for saida in saidas)
+    
+    @staticmethod
+    def _response_tokens(response) -> tuple:
+        """Extrai (tokens de entrada, tokens de saída) das métricas da rodada"""
+        metrics = getattr(response, "metrics", None) or {}
+        return sum(metrics.get("input_tokens") or []) or None, sum(metrics.get("output_tokens") or []) or None
+    
+    def _reconcile_order_id(self):
+        """Troca o código provisório da fila local pelo ID real do pedido e avisa das escritas perdidas.
+        
+        Se a criação do pedido falhou de vez na fila, esquece o código
+        provisório; se itens ou endereço não chegaram à API, volta para a
+        criação do pedido para refazê-los. Devolve o aviso a ser dado ao
+        cliente, uma vez por falha.
+        """
+        order_id = self.conversation_state["order_id"]
+        if not order_outbox or not order_id:
+            return None
+        
+        real_id = order_outbox.resolve(order_id)
+        if real_id and real_id != order_id:
+            self.conversation_state["order_id"] = real_id
+            event_logger.info("order.reconciled", provisional_id=order_id, order_id=real_id)
+        
+        falhas = order_outbox.take_failures(order_id)
+        if not falhas:
+            return None
+        
+        estado_atual = self.conversation_state["estado"]
+        self.conversation_state["estado"] = self.ESTADO_CRIANDO_PEDIDO
+        if real_id is None:
+            event_logger.error("order.create_failed", provisional_id=order_id, error=falhas[0]["error"])
+            self.conversation_state["order_id"] = None
+            self._log_transition(estado_atual, "falha ao criar pedido na API", provisional_id=order_id)
+            return self.RESPOSTA_FALHA_PEDIDO.format(order_id=order_id)
+        
+        perdidos = []
+        for falha in falhas:
+            if falha["op"] == "add_items":
+                perdidos.extend(item["name"] for item in falha["payload"]["items"])
+            elif falha["op"] == "update_address":
+                perdidos.append("o endereço de entrega")
+        event_logger.error("order.write_failed", order_id=real_id, ops=[falha["op"] for falha in falhas], error=falhas[-1]["error"])
+        self._log_transition(estado_atual, "falha ao enviar alterações do pedido", order_id=real_id)
+        return self.RESPOSTA_FALHA_ALTERACAO.format(order_id=real_id, perdidos=", ".join(perdidos))
+    
     def _check_for_existing_order(self, message: str):
         """Detecta se cliente mencionou um pedido existente"""
         import re
@@ -85,16 +399,118 @@ class BeautyPizzaAgent:
             r'#(\d+)'
         ]
         
+        # Na coleta de dados, "número 10" é o número da casa, não um pedido
+        if self.conversation_state["estado"] == self.ESTADO_COLETANDO_DADOS:
+            patterns.remove(r'número\s+(?:#)?(\d+)')
+        
         for pattern in patterns:
             match = re.search(pattern, message.lower())
             if match:
                 order_id = int(match.group(1))
-                print(f"[Bella] Cliente mencionou pedido existente: #{order_id}")
+                event_logger.info("order.mentioned", order_id=order_id)
                 self.conversation_state["order_id"] = order_id
+                prefetcher.submit("order", order_id, load_order, order_id)
                 # Se mencionou pedido existente, vai para estado de criação/finalização
                 self.conversation_state["estado"] = self.ESTADO_CRIANDO_PEDIDO
                 break
     
+    def _customer_data(self) -> dict:
+        endereco = self.conversation_state.get("endereco_temporario") or {}
+        return {
+            "nome": self.conversation_state.get("nome_temporario"),
+            "documento": self.conversation_state.get("documento_temporario"),
+            **endereco,
+        }
+    
+    def _collect_customer_data(self, message: str):
+        """Extrai localmente os dados do cliente na coleta; devolve a próxima pergunta sem chamar o modelo.
+        
+        Devolve None, e a rodada segue para o modelo, quando a mensagem pede
+        algo além dos dados, quando os dados ficam completos (o modelo mostra o
+        resumo e pede a confirmação) e quando o cliente confirma o resumo (aí
+        avança para a criação do pedido).
+        """
+        if self.conversation_state["estado"] != self.ESTADO_COLETANDO_DADOS:
+            return None
+        
+        resultado = extract_customer_data(message, self._customer_data())
+        extraido = customer_fields(resultado)
+        
+        if not extraido and self.conversation_state.get("resumo_mostrado") and self._is_confirmation(message):
+            estado_atual = self.conversation_state["estado"]
+            self.conversation_state["estado"] = self.ESTADO_CRIANDO_PEDIDO
+            self._log_transition(estado_atual, "cliente confirmou os dados")
+            return None
+        
+        if not extraido and "documento_invalido" not in resultado:
+            return None
+        
+        if extraido.get("nome"):
+            self.conversation_state["nome_temporario"] = extraido["nome"]
+        if extraido.get("documento"):
+            self.conversation_state["documento_temporario"] = extraido["documento"]
+        endereco = {campo: extraido[campo] for campo in CAMPOS_ENDERECO if extraido.get(campo)}
+        if endereco:
+            self.conversation_state["endereco_temporario"] = {
+                **(self.conversation_state.get("endereco_temporario") or {}),
+                **endereco,
+            }
+        if extraido:
+            # Dados novos pedem um novo resumo antes da confirmação
+            self.conversation_state["resumo_mostrado"] = False
+            event_logger.info("agent.client_data_saved", fields=sorted(extraido))
+        
+        faltando = missing_fields(self._customer_data())
+        if resultado.get("nao_usado") or not faltando:
+            return None
+        
+        event_logger.info("agent.local_reply", faltando=faltando)
+        return self._ask_missing_data(faltando, resultado)
+    
+    @staticmethod
+    def _is_confirmation(message: str) -> bool:
+        mensagem = message.lower()
+        if re.search(r"\b(?:não|nao|espera|troca|trocar|muda|mudar|errado)\b", mensagem):
+            return False
+        return bool(re.search(r"\b(?:sim|correto|confirma|confirmo|pode|finaliza|finalizar|tudo certo|isso mesmo|ok)\b", mensagem))
+    
+    def _ask_missing_data(self, faltando: list, extraido: dict) -> str:
+        nome = self.conversation_state.get("nome_temporario")
+        inicio = f"Obrigada, {nome.split()[0]}! 😊" if nome else "Obrigada! 😊"
+        
+        if extraido.get("documento_invalido") and "documento" in faltando:
+            return f"{inicio} O CPF {extraido['documento_invalido']} não parece válido. Pode conferir e me mandar de novo?"
+        
+        pedidos = []
+        if "nome" in faltando:
+            pedidos.append("seu nome")
+        if "documento" in faltando:
+            pedidos.append("seu CPF ou RG")
+        if "rua" in faltando:
+            pedidos.append("o endereço de entrega (rua, número, complemento e um ponto de referência)")
+        elif "numero" in faltando:
+            pedidos.append(f"o número da casa na {self.conversation_state['endereco_temporario']['rua']}")
+        
+        return f"{inicio} Agora só falta {' e '.join(pedidos)}."
+    
+    def _prefetch_for_state(self, message: str):
+        """Antecipa em segundo plano os dados que o estado atual quase sempre pede"""
+        estado = self.conversation_state["estado"]
+        
+        if estado in (self.ESTADO_INICIAL, self.ESTADO_CONSULTANDO_CARDAPIO, self.ESTADO_ADD_PIZZAS_TEMPORARIAS):
+            mensagem = message.lower()
+            for pizza in knowledge_base.get_price_cube().pizzas:
+                sabor = pizza['sabor'].lower()
+                if sabor in mensagem:
+                    prefetcher.submit("pizza_info", sabor, load_pizza_info, pizza['sabor'])
+        
+        elif estado in (self.ESTADO_COLETANDO_DADOS, self.ESTADO_CRIANDO_PEDIDO):
+            prefetcher.warm("order_api", order_api.warm_up)
+    
+    def _prefetch_after_transition(self, estado_anterior: str, message: str):
+        if self.conversation_state["estado"] != estado_anterior:
+            self._prefetch_for_state(message)
+    
     def _get_dynamic_instructions(self) -> str:
         """Gera instruções específicas para cada estado do fluxo"""
         estado = self.conversation_state["estado"]
@@ -102,25 +518,32 @@ class BeautyPizzaAgent:
         
         base = "Você é Bella, atendente virtual da pizzaria Beauty Pizza. Seja simpática e natural.\n\n"
         
+        # O resumo do cardápio fica na parte estável das instruções, igual em todos os estados
+        cardapio = menu_digest.get() if self.preload_menu else None
+        self._menu_preloaded = bool(cardapio)
+        if cardapio:
+            base += cardapio + "\n"
+        fonte_cardapio = "o CARDÁPIO acima (use get_menu() só se faltar alguma informação)" if cardapio else "a tool get_menu()"
+        
         if estado == self.ESTADO_INICIAL:
-            return base + dedent("""
+            return base + dedent(f"""
             ESTADO: Saudação Inicial
             
             AÇÕES:
             1. Cumprimente o cliente de forma amigável
             2. Pergunte se ele já sabe o que vai pedir ou se quer ver o cardápio
-            3. Se ele quiser o cardápio ou não souber o que quer, ajude-o com a tool get_menu()
+            3. Se ele quiser o cardápio ou não souber o que quer, ajude-o com {fonte_cardapio}
             4. Se ele já souber qual pizza quer, use o get_pizza_info(sabor)
             
             NÃO peça informações pessoais ainda.
             """)
         
         elif estado == self.ESTADO_CONSULTANDO_CARDAPIO:
-            return base + dedent("""
+            return base + dedent(f"""
             ESTADO: Consultando Cardápio
             
             AÇÕES:
-            1. Use get_menu() para mostrar as opções
+            1. Mostre as opções usando {fonte_cardapio}
             2. Responda dúvidas sobre pizzas usando get_pizza_info(sabor)
             3. Informe preços com get_pizza_price(sabor, tamanho, borda)
             4. Quando o cliente decidir o que quer, avance para próximo estado
@@ -146,44 +569,54 @@ class BeautyPizzaAgent:
                - Anote mentalmente a pizza (sabor, tamanho, borda, quantidade, preço)
                - Mostre o preço ao cliente
             2. Pergunte se deseja adicionar mais pizzas
-            3. Quando o cliente já tiver escolhido e não quiser mais, avance para a coleta de dados do cliente
+            3. Para mostrar o resumo de várias pizzas, use quote_cart(itens) em vez de get_pizza_price() para cada uma
+            4. Quando o cliente já tiver escolhido e não quiser mais, avance para a coleta de dados do cliente
             
             ⚠️ NÃO use create_order() ou add_pizza_to_order() ainda!
             ⚠️ Apenas valide as pizzas e anote as escolhas no estado pizzas_temporarias.
             """)
 
         if estado == self.ESTADO_COLETANDO_DADOS:
-            return base + dedent("""
+            dados = self._customer_data()
+            anotados = " | ".join(f"{campo} {dados[campo]}" for campo in ("nome", "documento", *CAMPOS_ENDERECO) if dados.get(campo))
+            return base + dedent(f"""
             ESTADO: Coletando Nome, CPF e Pizzas do Cliente
             
+            DADOS JÁ ANOTADOS (não pergunte de novo): {anotados or "nenhum"}
+            
             AÇÕES:
             1. IMPORTANTE: NÃO crie o pedido ainda!
             2. Pergunte o nome cliente
             3. Pergunte o Documento (CPF ou RG)
             4. Pergunte o endereço de entrega: Rua, Número, Complemento, Referência
-            5. Mostre o resumo das pizzas escolhidas com os preços
-            6. Quando cliente confirmar todas as pizzas
-            7. Avance para criar o pedido
+            5. Com todos os dados anotados, mostre o resumo: pizzas escolhidas com os preços usando quote_cart(itens), nome, documento e endereço
+            6. Peça que o cliente confirme o resumo (sim/confirma)
+            7. Só depois da confirmação o pedido será criado
 
             ⚠️ NÃO use create_order() ou add_pizza_to_order() ainda!
             ⚠️ Apenas valide as pizzas e anote as escolhas.
             """)
 
         elif estado == self.ESTADO_CRIANDO_PEDIDO:
+            dados = self._customer_data()
+            endereco = ", ".join(str(dados[c]) for c in CAMPOS_ENDERECO if dados.get(c)) or "não informado"
             return base + dedent(f"""
             ESTADO: Criando Pedido Completo
             
             AGORA SIM! Chegou a hora de criar o pedido com todas as informações.
             
+            DADOS DO CLIENTE (já coletados, não pergunte de novo): nome {dados['nome'] or 'não informado'} | documento {dados['documento'] or 'não informado'} | endereço {endereco}
+            
             AÇÕES:
             1. Use create_order(nome, cpf) para criar o pedido
             2. IMPORTANTE: Guarde o order_id retornado
             3. Para cada pizza da lista, use add_pizza_to_order(order_id, sabor, tamanho, borda, quantidade)
             4. Use update_delivery_address(order_id, rua, numero, complemento, referencia)
             5. Use get_order(order_id) para buscar o pedido completo
-            6. Confirme os detalhes com o cliente
-            7. Caso necessário, ajuste o pedido (adicione/remova itens/altere endereço)
-            8. Avance para finalizado
+            6. Use quote_cart(itens, order_id) para conferir o total do pedido
+            7. Confirme os detalhes com o cliente
+            8. Caso necessário, ajuste o pedido (adicione/remova itens/altere endereço)
+            9. Avance para finalizado
             """)
         
         elif estado == self.ESTADO_FINALIZADO:
@@ -198,6 +631,18 @@ class BeautyPizzaAgent:
         
         return base
     
+    def _reply_without_model(self, message: str, reply: str) -> str:
+        """Guarda a troca respondida sem o modelo, para ele recebê-la na próxima rodada"""
+        self._historico_pendente.extend([("Cliente", message), ("Bella", reply)])
+        return reply
+    
+    def _with_pending_history(self, message: str) -> str:
+        """Põe na frente da mensagem as trocas que não passaram pelo modelo, para o histórico não ter buracos"""
+        if not self._historico_pendente:
+            return message
+        trocas = "\n".join(f"{quem}: {texto}" for quem, texto in self._historico_pendente)
+        return f"[CONVERSA DESDE A SUA ÚLTIMA RESPOSTA, JÁ RESPONDIDA AO CLIENTE]\n{trocas}\n[MENSAGEM ATUAL]\n{message}"
+    
     def _enrich_with_order_context(self, message: str) -> str:
         """Adiciona contexto do pedido à mensagem"""
         context_parts = []
@@ -220,36 +665,27 @@ class BeautyPizzaAgent:
         if estado_atual == self.ESTADO_INICIAL:
             if "cardápio" in user_message.lower() or "menu" in user_message.lower():
                 self.conversation_state["estado"] = self.ESTADO_CONSULTANDO_CARDAPIO
-                print("[Bella] Cliente pediu cardápio. Avançando para CONSULTANDO_CARDAPIO...")
+                self._log_transition(estado_atual, "cliente pediu cardápio")
             elif any(word in user_message.lower() for word in ["quero", "vou", "gostaria", "pizza", "calabresa", "margherita", "portuguesa"]):
                 self.conversation_state["estado"] = self.ESTADO_ADD_PIZZAS_TEMPORARIAS
-                print("[Bella] Cliente já sabe o que quer. Avançando para ADD_PIZZAS_TEMPORARIAS...")
+                self._log_transition(estado_atual, "cliente já sabe o que quer")
         
         elif estado_atual == self.ESTADO_CONSULTANDO_CARDAPIO:
             if any(word in user_message.lower() for word in ["quero", "vou pedir", "escolhi", "decidir", "essa", "essa pizza"]):
                 self.conversation_state["estado"] = self.ESTADO_ADD_PIZZAS_TEMPORARIAS
-                print("[Bella] Cliente decidiu. Avançando para ADD_PIZZAS_TEMPORARIAS...")
+                self._log_transition(estado_atual, "cliente decidiu")
         
         elif estado_atual == self.ESTADO_ADD_PIZZAS_TEMPORARIAS:
             if any(word in user_message.lower() for word in ["só isso", "só", "apenas isso", "sim", "é isso", "finalizar", "confirmar"]):
                 self.conversation_state["estado"] = self.ESTADO_COLETANDO_DADOS
-                print("[Bella] Pizzas finalizadas! Avançando para COLETANDO_DADOS...")
+                self._log_transition(estado_atual, "pizzas finalizadas")
         
         elif estado_atual == self.ESTADO_COLETANDO_DADOS:
-            has_numbers = bool(re.search(r'\d{6,}', user_message))
-            
-            has_address = any(word in user_message.lower() for word in ["rua", "avenida", "av", "número", "n°", "nº"])
-            
-            if self.conversation_state.get("nome_temporario") and (has_numbers or has_address):
-                if any(word in user_message.lower() for word in ["sim", "correto", "confirma", "pode", "finaliza", "tudo certo", "isso mesmo"]):
-                    self.conversation_state["estado"] = self.ESTADO_CRIANDO_PEDIDO
-                    print("[Bella] Todos os dados coletados! Avançando para CRIANDO_PEDIDO...")
-            elif len(user_message.split(',')) >= 2 or (len(user_message.split()) >= 2 and has_numbers):
-                words = user_message.split(',')
-                if len(words) >= 2:
-                    self.conversation_state["nome_temporario"] = words[0].strip()
-                    self.conversation_state["documento_temporario"] = re.sub(r'\D', '', words[1].strip())
-                    print(f"[Bella] Nome e documento salvos temporariamente: {self.conversation_state['nome_temporario']}")
+            # Os dados são extraídos e a confirmação é lida antes da rodada
+            # (_collect_customer_data); com os dados completos, o modelo acabou
+            # de mostrar o resumo e a próxima mensagem pode confirmá-lo
+            if not missing_fields(self._customer_data()):
+                self.conversation_state["resumo_mostrado"] = True
         
         elif estado_atual == self.ESTADO_CRIANDO_PEDIDO:
             if "pedido" in agent_response.lower() and "#" in agent_response:
@@ -257,7 +693,16 @@ class BeautyPizzaAgent:
                 if match:
                     self.conversation_state["order_id"] = int(match.group(1))
                     self.conversation_state["estado"] = self.ESTADO_FINALIZADO
-                    print(f"[Bella] Pedido #{self.conversation_state['order_id']} finalizado com sucesso!")
+                    self._log_transition(estado_atual, "pedido finalizado", order_id=self.conversation_state["order_id"])
+    
+    def _log_transition(self, estado_anterior: str, motivo: str, **fields):
+        event_logger.info(
+            "agent.state_transition",
+            de=estado_anterior,
+            para=self.conversation_state["estado"],
+            motivo=motivo,
+            **fields
+        )
     
     def reset_conversation(self):
         """Reinicia a conversa"""
@@ -270,6 +715,9 @@ class BeautyPizzaAgent:
             "endereco_temporario": None,
             "nome_temporario": None,
             "documento_temporario": None,
+            "resumo_mostrado": False,
             "saudacao_feita": False,
         }
-        print("[Bella] Conversa reiniciada!")
\ No newline at end of file
+        self._turnos = 0
+        self._historico_pendente = []
+        event_logger.info("agent.conversation_reset", session_id=self.session_id)
\ No newline at end of file
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import threading
+from typing import Dict, Optional
+
+from integrations import KnowledgeBase
+from utils import event_logger
+from .tools import knowledge_base
+
+
+class MenuDigest:
+    """Resumo compacto e versionado do cardápio para ir direto nas instruções.
+
+    Evita a ida e volta do ``get_menu()`` nos estados de navegação. Se o
+    cardápio passar do orçamento de tokens, nenhum resumo é gerado e o agente
+    continua usando a ferramenta.
+    """
+
+    def __init__(self, knowledge_base: KnowledgeBase, max_tokens: int = 800):
+        self.knowledge_base = knowledge_base
+        self.max_tokens = max_tokens
+
+        self._lock = threading.Lock()
+        self._menu_version = None
+        self._digest = None
+
+        self._turns = {
+            True: {"turns": 0, "get_menu_calls": 0, "tool_calls": 0, "seconds": 0.0},
+            False: {"turns": 0, "get_menu_calls": 0, "tool_calls": 0, "seconds": 0.0},
+        }
+
+    @classmethod
+    def from_env(cls, knowledge_base: KnowledgeBase) -> "MenuDigest":
+        return cls(knowledge_base, max_tokens=int(os.getenv('MENU_DIGEST_MAX_TOKENS', '800')))
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        return len(text) // 4 + 1
+
+    def render(self) -> Optional[str]:
+        cube = self.knowledge_base.get_price_cube()
+        bordas = [crust['tipo'] for crust in cube.crusts]
+
+        lines = [
+            f"Tamanhos: {', '.join(size['tamanho'] for size in cube.sizes)}",
+            f"Bordas (ordem dos preços): {', '.join(bordas)}",
+            "Sabores — ingredientes | preços em R$ por tamanho (uma coluna por borda):",
+        ]
+        for pizza in cube.pizzas:
+            precos_por_tamanho = {}
+            for size, crust, preco in cube.prices_for_pizza(pizza['id']):
+                precos_por_tamanho.setdefault(size['tamanho'], {})[crust['tipo']] = preco
+
+            precos = " · ".join(
+                f"{tamanho}: " + "/".join(
+                    f"{precos[borda]:.2f}" if borda in precos else "-"
+                    for borda in bordas
+                )
+                for tamanho, precos in precos_por_tamanho.items()
+            )
+            lines.append(f"- {pizza['sabor']} — {pizza['ingredientes']} | {precos}")
+
+        body = "\n".join(lines)
+        version = hashlib.sha1(body.encode('utf-8')).hexdigest()[:8]
+        digest = f"CARDÁPIO (versão {version}):\n{body}\n"
+
+        if self.estimate_tokens(digest) > self.max_tokens:
+            event_logger.info("menu_digest.over_budget", tokens=self.estimate_tokens(digest), max_tokens=self.max_tokens)
+            return None
+        return digest
+
+    def get(self) -> Optional[str]:
+        """Retorna o resumo da versão atual do cardápio, renderizando só quando ela muda"""
+        menu_version = self.knowledge_base.get_menu_version()
+        with self._lock:
+            if menu_version != self._menu_version:
+                self._digest = self.render()
+                self._menu_version = menu_version
+            return self._digest
+
+    def record_turn(self, preloaded: bool, tool_names: list, seconds: float):
+        """Registra uma rodada de navegação, com ou sem o cardápio nas instruções"""
+        with self._lock:
+            turns = self._turns[preloaded]
+            turns["turns"] += 1
+            turns["get_menu_calls"] += tool_names.count("get_menu")
+            turns["tool_calls"] += len(tool_names)
+            turns["seconds"] += seconds
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {}
+            for preloaded, turns in self._turns.items():
+                n = turns["turns"] or 1
+                stats["preloaded" if preloaded else "tool"] = {
+                    **turns,
+                    "get_menu_calls_per_turn": turns["get_menu_calls"] / n,
+                    "tool_calls_per_turn": turns["tool_calls"] / n,
+                    "avg_seconds": turns["seconds"] / n,
+                }
+        stats["get_menu_calls_saved_per_turn"] = (
+            stats["tool"]["get_menu_calls_per_turn"] - stats["preloaded"]["get_menu_calls_per_turn"]
+        )
+        stats["seconds_saved_per_turn"] = stats["tool"]["avg_seconds"] - stats["preloaded"]["avg_seconds"]
+        return stats
+
+
+menu_digest = MenuDigest.from_env(knowledge_base)
@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Deque, Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    """Modelo, limites de geração e ferramentas expostas numa rodada"""
+    model_id: str = "gpt-4o-mini"
+    max_tokens: Optional[int] = None
+    temperature: float = 0.7
+    tools: Tuple[str, ...] = ()
+
+
+FERRAMENTAS_CARDAPIO = ("get_menu", "get_pizza_info", "get_pizza_price")
+FERRAMENTAS_PEDIDO = (
+    "create_order",
+    "add_pizza_to_order",
+    "update_delivery_address",
+    "get_order",
+    "get_order_items",
+    "get_order_total",
+    "remove_item_from_order",
+    "quote_cart",
+)
+
+# Estados em que o modelo pode listar o cardápio inteiro: o limite cobre o
+# resumo do cardápio (MENU_DIGEST_MAX_TOKENS, 800 por padrão) com folga
+MAX_TOKENS_CARDAPIO = 1200
+
+# Estado da conversa -> perfil. Conversa e navegação pedem respostas curtas;
+# a criação do pedido encadeia ferramentas e precisa de saída previsível.
+DEFAULT_ROUTES: Dict[str, ModelProfile] = {
+    "inicial": ModelProfile(max_tokens=MAX_TOKENS_CARDAPIO, temperature=0.7, tools=("get_menu", "get_pizza_info")),
+    "consultando_cardapio": ModelProfile(max_tokens=MAX_TOKENS_CARDAPIO, temperature=0.5, tools=FERRAMENTAS_CARDAPIO),
+    "adicionando_pizzas": ModelProfile(max_tokens=500, temperature=0.3, tools=("get_pizza_info", "get_pizza_price", "quote_cart")),
+    "coletando_dados": ModelProfile(max_tokens=400, temperature=0.3, tools=("quote_cart",)),
+    "criando_pedido": ModelProfile(max_tokens=800, temperature=0.1, tools=FERRAMENTAS_PEDIDO + ("get_pizza_price",)),
+    "finalizado": ModelProfile(max_tokens=500, temperature=0.7, tools=("get_order", "get_order_items", "get_order_total")),
+}
+
+
+class ModelRouter:
+    """Escolhe o perfil de modelo de cada rodada pelo estado da conversa.
+
+    Também acumula, por estado, latência e tokens das rodadas para que cada
+    perfil possa ser ajustado com base no que de fato custa.
+    """
+
+    def __init__(self, routes: Dict[str, ModelProfile], default: ModelProfile = ModelProfile(),
+                 window: int = 500):
+        self.routes = dict(routes)
+        self.default = default
+        self.window = window
+
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._stats: Dict[str, Dict] = {}
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        """Tabela padrão com ajustes de ``LLM_MODEL`` (todos os estados) e ``LLM_MODEL_ROUTES``.
+
+        ``LLM_MODEL_ROUTES`` é um JSON de estado para campos do perfil, ex.:
+        ``{"criando_pedido": {"model_id": "gpt-4o", "max_tokens": 1000}}``.
+        """
+        routes = dict(DEFAULT_ROUTES)
+        model_id = os.getenv('LLM_MODEL')
+        if model_id:
+            routes = {estado: replace(profile, model_id=model_id) for estado, profile in routes.items()}
+
+        overrides = json.loads(os.getenv('LLM_MODEL_ROUTES') or '{}')
+        for estado, fields in overrides.items():
+            if 'tools' in fields:
+                fields = {**fields, 'tools': tuple(fields['tools'])}
+            routes[estado] = replace(routes.get(estado, ModelProfile()), **fields)
+
+        return cls(routes, ModelProfile(model_id=model_id or ModelProfile.model_id))
+
+    def profile_for(self, estado: str) -> ModelProfile:
+        return self.routes.get(estado, self.default)
+
+    def record(self, estado: str, profile: ModelProfile, latency: float,
+               input_tokens: Optional[int] = None, output_tokens: Optional[int] = None):
+        with self._lock:
+            stats = self._stats.setdefault(estado, {
+                "model_id": profile.model_id,
+                "turns": 0,
+                "total_seconds": 0.0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+            })
+            stats["model_id"] = profile.model_id
+            stats["turns"] += 1
+            stats["total_seconds"] += latency
+            stats["input_tokens"] += input_tokens or 0
+            stats["output_tokens"] += output_tokens or 0
+            self._latencies.setdefault(estado, deque(maxlen=self.window)).append(latency)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            result = {}
+            for estado, stats in self._stats.items():
+                latencies = sorted(self._latencies[estado])
+                turns = stats["turns"]
+                result[estado] = {
+                    **stats,
+                    "mean_seconds": stats["total_seconds"] / turns,
+                    "p50_seconds": latencies[len(latencies) // 2],
+                    "p95_seconds": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                    "avg_output_tokens": stats["output_tokens"] / turns,
+                }
+            return result
+
+
+model_router = ModelRouter.from_env()
@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Optional
+
+from utils import event_logger
+
+
+class Prefetcher:
+    """Busca em segundo plano dados que o próximo passo da conversa quase sempre usa.
+
+    Cada resultado antecipado fica guardado por ``ttl`` segundos e é consumido
+    uma única vez pela ferramenta que precisa dele; o que expira sem uso conta
+    como desperdício nas métricas.
+    """
+
+    def __init__(self, max_workers: int = 4, ttl: float = 60.0):
+        self.ttl = ttl
+        # Desligado, ``submit`` e ``warm`` não fazem nada e as ferramentas buscam direto
+        self.enabled = True
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._pending: Dict[tuple, tuple] = {}
+        self._warmed: Dict[Hashable, float] = {}
+
+        self._stats = {
+            "issued": 0,
+            "hits": 0,
+            "misses": 0,
+            "wasted": 0,
+            "errors": 0,
+            "warmups": 0,
+            "saved_seconds": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "Prefetcher":
+        return cls(
+            max_workers=int(os.getenv('PREFETCH_WORKERS', '4')),
+            ttl=float(os.getenv('PREFETCH_TTL', '60')),
+        )
+
+    def _expire(self, now: float):
+        expired = [key for key, (_, expires_at, _) in self._pending.items() if expires_at < now]
+        for key in expired:
+            del self._pending[key]
+        self._stats["wasted"] += len(expired)
+
+    def submit(self, kind: str, key: Hashable, loader: Callable, *args):
+        """Agenda ``loader(*args)`` se o mesmo dado ainda não estiver antecipado"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if (kind, key) in self._pending:
+                return
+            future = self._executor.submit(self._timed, loader, *args)
+            self._pending[(kind, key)] = (future, now + self.ttl, now)
+            self._stats["issued"] += 1
+
+    @staticmethod
+    def _timed(loader: Callable, *args):
+        started = time.perf_counter()
+        result = loader(*args)
+        return result, time.perf_counter() - started
+
+    def take(self, kind: str, key: Hashable, timeout: Optional[float] = None):
+        """Consome o dado antecipado; retorna None se não houver (ou se a busca falhou)"""
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._pending.pop((kind, key), None)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+        future: Future = entry[0]
+        try:
+            # Se a busca ainda está em andamento, esperar por ela sai mais barato que repeti-la
+            result, load_seconds = future.result(timeout=timeout)
+        except Exception as e:
+            event_logger.warning("prefetch.failed", kind=kind, key=str(key), error=str(e))
+            with self._lock:
+                self._stats["errors"] += 1
+            return None
+
+        with self._lock:
+            self._stats["hits"] += 1
+            self._stats["saved_seconds"] += load_seconds
+        return result
+
+    def discard(self, kind: str, key: Hashable):
+        """Descarta um dado antecipado que ficou desatualizado (ex.: pedido alterado)"""
+        with self._lock:
+            if self._pending.pop((kind, key), None) is not None:
+                self._stats["wasted"] += 1
+
+    def warm(self, key: Hashable, fn: Callable, interval: float = 30.0):
+        """Executa ``fn`` em segundo plano no máximo uma vez a cada ``interval`` segundos"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._warmed.get(key, float('-inf')) < interval:
+                return
+            self._warmed[key] = now
+            self._stats["warmups"] += 1
+        self._executor.submit(fn)
+
+    def clear(self, kind: Optional[str] = None):
+        """Descarta as buscas pendentes; com ``kind``, só as daquele tipo"""
+        with self._lock:
+            keys = [key for key in self._pending if kind is None or key[0] == kind]
+            self._stats["wasted"] += len(keys)
+            for key in keys:
+                del self._pending[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        used = stats["hits"] + stats["wasted"]
+        stats["hit_rate"] = stats["hits"] / (stats["hits"] + stats["misses"]) if stats["hits"] + stats["misses"] else 0.0
+        stats["usefulness"] = stats["hits"] / used if used else 0.0
+        return stats
+
+
+prefetcher = Prefetcher.from_env()
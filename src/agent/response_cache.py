@@ -0,0 +1,104 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+
+class ResponseCache:
+    """Cache LRU com TTL de respostas para rodadas que não dependem do pedido.
+
+    A chave é (estado, mensagem normalizada, versão das instruções, versão do
+    cardápio); quando a versão do cardápio muda, o cache inteiro é descartado.
+    Como a chave não leva o histórico, só serve para a primeira rodada de
+    uma sessão, ou seja, para as saudações de abertura (quem usa é que garante isso).
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._menu_version = None
+
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+            "saved_seconds": 0.0,
+            "hit_seconds": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        return cls(
+            max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', '1000')),
+            ttl=float(os.getenv('RESPONSE_CACHE_TTL', '600')),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        text = unicodedata.normalize('NFKD', message.lower())
+        text = "".join(c for c in text if not unicodedata.combining(c))
+        text = re.sub(r'[^\w\s]', ' ', text)
+        return " ".join(text.split())
+
+    def key(self, estado: str, message: str, instructions: str, menu_version: Hashable) -> tuple:
+        with self._lock:
+            if menu_version != self._menu_version:
+                if self._entries:
+                    self._stats["invalidations"] += 1
+                self._entries.clear()
+                self._menu_version = menu_version
+
+        instructions_version = hashlib.sha1(instructions.encode('utf-8')).hexdigest()[:12]
+        return (estado, self.normalize(message), instructions_version, menu_version)
+
+    def get(self, key: tuple) -> Optional[str]:
+        started = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            self._stats["saved_seconds"] += entry[2]
+            self._stats["hit_seconds"] += time.perf_counter() - started
+            return entry[0]
+
+    def put(self, key: tuple, response: str, latency: float):
+        """Guarda a resposta junto com quanto ela custou para ser gerada"""
+        with self._lock:
+            self._entries[key] = (response, time.monotonic() + self.ttl, latency)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["avg_hit_seconds"] = stats["hit_seconds"] / stats["hits"] if stats["hits"] else 0.0
+        return stats
+
+
+response_cache = ResponseCache.from_env()
@@ -0,0 +1,236 @@
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional
+from utils.deadline import DeadlineExceeded
+
+
+class SchedulerSaturated(Exception):
+    """Fila de chamadas ao modelo cheia ou espera acima do limite"""
+
+
+class TokenBucket:
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """Segundos até haver saldo para ``amount`` (0 se já houver)"""
+        self._refill(now)
+        # Pedidos maiores que a capacidade só esperam o balde encher
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Cobra (positivo) ou devolve (negativo) saldo após saber o consumo real"""
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+@dataclass
+class Ticket:
+    session_id: str
+    estimated_tokens: int
+    priority: int
+    seq: int
+    enqueued_at: float = field(default_factory=time.monotonic)
+    granted_at: Optional[float] = None
+
+
+class ModelCallScheduler:
+    """Controle de admissão para chamadas ao modelo, compartilhado pelo processo.
+
+    Usa baldes de tokens para requisições e tokens por minuto e fila justa
+    entre sessões: a cada liberação é atendida a sessão de maior prioridade
+    que está há mais tempo sem ser servida, então um cliente falante não
+    segura os demais.
+    """
+
+    def __init__(self, requests_per_minute: int = 500, tokens_per_minute: int = 200_000,
+                 max_concurrency: int = 16, max_queue_wait: float = 20.0,
+                 max_queue_depth: int = 1000):
+        self.requests_bucket = TokenBucket(requests_per_minute)
+        self.tokens_bucket = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_queue_wait = max_queue_wait
+        self.max_queue_depth = max_queue_depth
+
+        self._cond = threading.Condition()
+        self._queues: Dict[str, Deque[Ticket]] = {}
+        self._last_served: Dict[str, int] = {}
+        self._serve_counter = itertools.count()
+        self._ticket_counter = itertools.count()
+        self._in_flight = 0
+        self._depth = 0
+
+        self._stats = {
+            "admitted": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+        }
+
+    def configure(self, requests_per_minute: int = None, tokens_per_minute: int = None,
+                  max_concurrency: int = None, max_queue_wait: float = None):
+        """Troca os limites em tempo de execução (ex.: testes de carga)"""
+        with self._cond:
+            if requests_per_minute is not None:
+                self.requests_bucket = TokenBucket(requests_per_minute)
+            if tokens_per_minute is not None:
+                self.tokens_bucket = TokenBucket(tokens_per_minute)
+            if max_concurrency is not None:
+                self.max_concurrency = max_concurrency
+            if max_queue_wait is not None:
+                self.max_queue_wait = max_queue_wait
+            self._cond.notify_all()
+
+    @classmethod
+    def from_env(cls) -> "ModelCallScheduler":
+        return cls(
+            requests_per_minute=int(os.getenv('LLM_REQUESTS_PER_MINUTE', '500')),
+            tokens_per_minute=int(os.getenv('LLM_TOKENS_PER_MINUTE', '200000')),
+            max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '16')),
+            max_queue_wait=float(os.getenv('LLM_MAX_QUEUE_WAIT', '20')),
+        )
+
+    def _head(self) -> Optional[Ticket]:
+        best = None
+        best_key = None
+        for session_id, queue in self._queues.items():
+            if not queue:
+                continue
+            ticket = queue[0]
+            key = (-ticket.priority, self._last_served.get(session_id, -1), ticket.seq)
+            if best_key is None or key < best_key:
+                best, best_key = ticket, key
+        return best
+
+    def _estimated_wait(self, now: float) -> float:
+        # Tempo para atender a fila atual mais uma chamada, ou para zerar o saldo
+        # negativo de tokens deixado por rodadas mais caras que o estimado
+        return max(
+            self.requests_bucket.time_until(self._depth + 1, now),
+            self.tokens_bucket.time_until(0, now),
+        )
+
+    def acquire(self, session_id: str, estimated_tokens: int, priority: int = 0,
+                timeout: Optional[float] = None) -> Ticket:
+        """Bloqueia até a chamada ao modelo ser admitida; quem recebe o ticket chama ``release``.
+
+        ``timeout`` é o tempo que resta ao turno: se for ele, e não
+        ``max_queue_wait``, que impede a admissão, levanta ``DeadlineExceeded``.
+        """
+        by_deadline = timeout is not None and timeout < self.max_queue_wait
+        timeout = self.max_queue_wait if timeout is None else min(timeout, self.max_queue_wait)
+
+        with self._cond:
+            now = time.monotonic()
+            if self._depth >= self.max_queue_depth:
+                self._stats["rejected"] += 1
+                raise SchedulerSaturated("Muitas conversas aguardando o modelo")
+            if self._estimated_wait(now) > timeout:
+                self._stats["rejected"] += 1
+                if by_deadline:
+                    raise DeadlineExceeded("Tempo do turno não basta para a fila do modelo")
+                raise SchedulerSaturated("Muitas conversas aguardando o modelo")
+
+            ticket = Ticket(session_id, estimated_tokens, priority, next(self._ticket_counter))
+            self._queues.setdefault(session_id, deque()).append(ticket)
+            self._depth += 1
+            deadline = ticket.enqueued_at + timeout
+
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if self._head() is ticket and self._in_flight < self.max_concurrency:
+                        wait = max(
+                            self.requests_bucket.time_until(1, now),
+                            self.tokens_bucket.time_until(estimated_tokens, now),
+                        )
+                        if wait == 0.0:
+                            break
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats["timed_out"] += 1
+                        if by_deadline:
+                            raise DeadlineExceeded("Tempo do turno esgotado na fila do modelo")
+                        raise SchedulerSaturated("Tempo de espera pelo modelo esgotado")
+                    self._cond.wait(min(remaining, wait) if wait else remaining)
+            except BaseException:
+                self._queues[session_id].remove(ticket)
+                if not self._queues[session_id]:
+                    del self._queues[session_id]
+                self._depth -= 1
+                self._cond.notify_all()
+                raise
+
+            self._queues[session_id].popleft()
+            if not self._queues[session_id]:
+                del self._queues[session_id]
+            self._depth -= 1
+            self._in_flight += 1
+            self._last_served[session_id] = next(self._serve_counter)
+            self.requests_bucket.take(1)
+            self.tokens_bucket.take(estimated_tokens)
+
+            ticket.granted_at = now
+            waited = now - ticket.enqueued_at
+            self._stats["admitted"] += 1
+            self._stats["total_wait"] += waited
+            self._stats["max_wait"] = max(self._stats["max_wait"], waited)
+
+            # Uma nova cabeça de fila pode já estar liberada
+            self._cond.notify_all()
+            return ticket
+
+    def release(self, ticket: Ticket):
+        with self._cond:
+            self._in_flight -= 1
+            if len(self._last_served) > 4 * self.max_queue_depth:
+                self._prune_last_served()
+            self._cond.notify_all()
+
+    def _prune_last_served(self):
+        # Esquecer as sessões ociosas servidas há mais tempo não muda a ordem:
+        # sem registro elas já seriam as primeiras da fila
+        idle = sorted(
+            (served, session_id)
+            for session_id, served in self._last_served.items()
+            if session_id not in self._queues
+        )
+        for _, session_id in idle[:len(idle) // 2]:
+            del self._last_served[session_id]
+
+    def record_usage(self, ticket: Ticket, total_tokens: Optional[int] = None, requests: int = 1):
+        """Ajusta os baldes com o consumo real da rodada (tokens e chamadas extras de ferramentas)"""
+        with self._cond:
+            if total_tokens is not None:
+                self.tokens_bucket.adjust(total_tokens - ticket.estimated_tokens)
+            if requests > 1:
+                self.requests_bucket.adjust(requests - 1)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            stats = dict(self._stats)
+        stats["avg_wait"] = stats["total_wait"] / stats["admitted"] if stats["admitted"] else 0.0
+        return stats
+
+
+model_scheduler = ModelCallScheduler.from_env()
@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, Optional, Set
+
+
+# Sessão da conversa atual, visível também na thread que roda o agente (contexto copiado)
+_tool_session: ContextVar[Optional[str]] = ContextVar("tool_session", default=None)
+
+
+@contextmanager
+def tool_session(session_id: str):
+    """Define a sessão dona dos resultados de ferramentas memorizados dentro do bloco"""
+    token = _tool_session.set(session_id)
+    try:
+        yield
+    finally:
+        _tool_session.reset(token)
+
+
+def current_tool_session() -> Optional[str]:
+    return _tool_session.get()
+
+
+def normalize_argument(value: Any) -> str:
+    """Forma canônica de um argumento: ``"Calabresa "`` e ``"calabresa"``, ``12`` e ``"12"`` dão a mesma chave"""
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).lower()
+    return str(value).strip().lower()
+
+
+class ToolResultCache:
+    """Memoização de resultados de ferramentas de leitura, por sessão e com TTL.
+
+    Cada entrada pode levar marcas (ex.: ``("order_id", "42")``); escritas
+    invalidam pela marca todas as leituras afetadas, em qualquer sessão.
+    """
+
+    def __init__(self, max_entries: int = 2000):
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[tuple, Set[Hashable]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def from_env(cls) -> "ToolResultCache":
+        return cls(max_entries=int(os.getenv('TOOL_CACHE_SIZE', '2000')))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _tool_stats(self, tool: str) -> Dict[str, int]:
+        return self._stats.setdefault(tool, {"hits": 0, "misses": 0, "invalidations": 0})
+
+    def _drop(self, key: Hashable):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, tool: str, key: Hashable):
+        """Devolve ``(True, resultado)`` se houver entrada válida, senão ``(False, None)``"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self._tool_stats(tool)["misses"] += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self._tool_stats(tool)["hits"] += 1
+            return True, entry[0]
+
+    def put(self, key: Hashable, result: Any, ttl: float, tags: tuple = ()):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (result, time.monotonic() + ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, tag: tuple) -> int:
+        """Remove as entradas com a marca; devolve quantas saíram"""
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._tool_stats(key[1])["invalidations"] += 1
+                self._drop(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            tools = {tool: dict(stats) for tool, stats in self._stats.items()}
+            entries = len(self._entries)
+        for stats in tools.values():
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return {"entries": entries, "tools": tools}
+
+
+tool_cache = ToolResultCache.from_env()
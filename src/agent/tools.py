@@ -1,21 +1,78 @@
+import os
+import functools
+import inspect
+from agno.exceptions import StopAgentRun
 from agno.tools import tool
 from typing import List, Dict
 from datetime import datetime, date
-from integrations import OrderAPI, KnowledgeBase
+from integrations import OrderAPI, OrderOutbox, KnowledgeBase, MenuWatcher
+from utils import event_logger
+from utils.deadline import current_deadline
+from .prefetch import prefetcher
+from .response_cache import response_cache
+from .tool_cache import current_tool_session, normalize_argument, tool_cache
 
 
 TOOLS_REGISTRY = {}
 
-def tool_register(name: str = None, description: str = None):
+def tool_register(name: str = None, description: str = None, cache_ttl: float = None,
+                  cache_tag: str = None, invalidates: str = None):
+    """Registra a função como ferramenta do agente.
+
+    ``cache_ttl`` memoriza o resultado por sessão, pela forma normalizada dos
+    argumentos; ``cache_tag`` marca a entrada com o valor desse argumento e
+    ``invalidates`` descarta, após a chamada, as entradas marcadas com o
+    valor desse argumento (ex.: escritas em um pedido e ``order_id``).
+    """
     def decorator(func):
         key = name or func.__name__
+        signature = inspect.signature(func)
+
+        def call_arguments(args, kwargs) -> Dict:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return bound.arguments
+
+        def cached_call(call, args, kwargs):
+            session_id = current_tool_session()
+            if not cache_ttl or session_id is None or not tool_cache.enabled:
+                return func(*args, **kwargs)
+
+            arguments = call_arguments(args, kwargs)
+            normalized = tuple(sorted((arg, normalize_argument(value)) for arg, value in arguments.items()))
+            cache_key = (session_id, key, normalized)
+
+            hit, result = tool_cache.get(key, cache_key)
+            call["cache"] = "hit" if hit else "miss"
+            if hit:
+                return result
+
+            result = func(*args, **kwargs)
+            # Erros não ficam guardados: a próxima chamada tenta de novo
+            if not (isinstance(result, dict) and "erro" in result):
+                tags = ((cache_tag, normalize_argument(arguments[cache_tag])),) if cache_tag else ()
+                tool_cache.put(cache_key, result, cache_ttl, tags)
+            return result
+
+        @functools.wraps(func)
+        def timed_func(*args, **kwargs):
+            # Com o prazo do turno esgotado, interrompe a execução do agente em vez de seguir chamando ferramentas
+            deadline = current_deadline()
+            if deadline is not None and deadline.expired:
+                raise StopAgentRun(f"Tempo do turno esgotado antes de {key}")
+            with event_logger.timed("tool.call", tool=key) as call:
+                result = cached_call(call, args, kwargs)
+                if invalidates:
+                    value = call_arguments(args, kwargs)[invalidates]
+                    call["invalidated"] = tool_cache.invalidate((invalidates, normalize_argument(value)))
+                return result
 
         wrapped_func = tool(
             name=key,
             description=description,
             show_result=False, 
             stop_after_tool_call=False
-        )(func)
+        )(timed_func)
 
         TOOLS_REGISTRY[key] = wrapped_func
         return func
@@ -30,58 +87,86 @@ def resolve_tools(tool_names: List[str] = None):
 knowledge_base = KnowledgeBase()
 order_api = OrderAPI()
 
+# Mudanças no cardápio (banco ou script .sql) entram em memória sem reiniciar;
+# MENU_WATCH_INTERVAL=0 desliga e as consultas voltam a ir direto ao SQLite.
+_menu_watch_interval = float(os.getenv('MENU_WATCH_INTERVAL', '2'))
+menu_watcher = MenuWatcher(knowledge_base, _menu_watch_interval).start() if _menu_watch_interval > 0 else None
+
+
+def _on_menu_updated(diff: Dict):
+    # Cubo de preços e resumo do cardápio se refazem sozinhos pela versão;
+    # aqui só descarta o que foi buscado ou respondido com o cardápio antigo.
+    prefetcher.clear("pizza_info")
+    response_cache.invalidate()
+    tool_cache.clear()
+
+
+knowledge_base.subscribe(_on_menu_updated)
+
+# Com ORDER_OUTBOX_PATH definido, as escritas de pedido vão para a fila local
+# e são entregues à Order API em segundo plano.
+order_outbox = OrderOutbox.from_env(order_api)
+order_writer = order_outbox or order_api
+
+
+def _resolve_order_id(order_id: int) -> int:
+    if order_outbox:
+        return order_outbox.wait_for(order_id)
+    return order_id
+
 
 @tool_register(
     name="get_menu",
+    cache_ttl=300,
     description="Retorna o cardápio completo da pizzaria com todas as pizzas disponíveis, sabores, ingredientes e descrições"
 )
 def get_menu() -> Dict:
     try:
-        print("[Bella] Buscando informações do cardápio no banco de dados...")
         pizzas = knowledge_base.get_all_pizzas()
         sizes = knowledge_base.get_sizes()
         crusts = knowledge_base.get_crusts()
-        print("[Bella] Cardápio recuperado com sucesso.")
         return {
             "pizzas": pizzas,
             "tamanhos": sizes,
             "bordas": crusts
         }
     except Exception as e:
-        print(f"[Bella] Erro ao buscar cardápio: {e}")
+        event_logger.error("tool.error", tool="get_menu", error=str(e))
         return {"erro": f"Não foi possível obter o cardápio: {str(e)}"}
 
 
 @tool_register(
     name="get_pizza_info",
+    cache_ttl=300,
     description="Retorna informações detalhadas de uma pizza específica pelo sabor, incluindo ingredientes, descrição e preços por tamanho e borda"
 )
 def get_pizza_info(sabor: str) -> Dict:
+    prefetched = prefetcher.take("pizza_info", sabor.strip().lower())
+    if prefetched is not None:
+        return prefetched
+    return load_pizza_info(sabor)
+
+
+def load_pizza_info(sabor: str) -> Dict:
     try:
-        print(f"[Bella] Buscando informações da pizza '{sabor}' no banco de dados...")
         pizza = knowledge_base.get_pizza_by_flavor(sabor)
         if not pizza:
-            print(f"[Bella] Pizza '{sabor}' não encontrada.")
+            event_logger.info("kb.pizza_not_found", sabor=sabor)
             return {"erro": f"Pizza com sabor '{sabor}' não encontrada no cardápio"}
-        sizes = knowledge_base.get_sizes()
-        crusts = knowledge_base.get_crusts()
-        precos = []
-        for size in sizes:
-            for crust in crusts:
-                preco = knowledge_base.get_price(pizza['id'], size['id'], crust['id'])
-                if preco:
-                    precos.append({
-                        "tamanho": size['tamanho'],
-                        "borda": crust['tipo'],
-                        "preco": preco
-                    })
-        print(f"[Bella] Informações da pizza '{sabor}' recuperadas.")
+        precos = [
+            {
+                "tamanho": size['tamanho'],
+                "borda": crust['tipo'],
+                "preco": preco
+            }
+            for size, crust, preco in knowledge_base.get_price_cube().prices_for_pizza(pizza['id'])
+        ]
         return {
             "pizza": pizza,
             "precos": precos
         }
     except Exception as e:
-        print(f"[Bella] Erro ao buscar informações da pizza: {e}")
+        event_logger.error("tool.error", tool="get_pizza_info", error=str(e))
         return {"erro": f"Erro ao buscar informações da pizza: {str(e)}"}
 
 
@@ -91,8 +176,6 @@ def get_pizza_info(sabor: str) -> Dict:
 )
 def create_order(client_name: str, client_document: str, delivery_date: str = None) -> Dict:
     try:
-        print("[Bella] Chamando a API de pedidos para criar um novo pedido...")
-        
         if delivery_date:
             try:
                 parsed_date = datetime.strptime(delivery_date, '%Y-%m-%d').date()
@@ -105,22 +188,23 @@ def create_order(client_name: str, client_document: str, delivery_date: str = No
         else:
             safe_delivery_date = date.today().strftime('%Y-%m-%d')
 
-        new_order = order_api.create_order(client_name, client_document, safe_delivery_date)
+        new_order = order_writer.create_order(client_name, client_document, safe_delivery_date)
         
         order_id = new_order.get('id')
-        print(f"[Bella] Pedido #{order_id} criado com sucesso!")
+        event_logger.info("order.created", order_id=order_id)
         
         new_order['status_beauty'] = 'created'
         new_order['mensagem_pedido'] = f"🎉 Pedido #{order_id} criado com sucesso! Informe este código ao cliente."
         
         return new_order
     except Exception as e:
-        print(f"[Bella] Erro ao criar pedido: {e}")
+        event_logger.error("tool.error", tool="create_order", error=str(e))
         return {"erro": f"Não foi possível criar o pedido: {str(e)}"}
 
 
 @tool_register(
     name="add_pizza_to_order",
+    invalidates="order_id",
     description="Adiciona uma pizza ao pedido especificando o ID do pedido, sabor, tamanho, borda e quantidade"
 )
 def add_pizza_to_order(order_id: int, pizza_flavor: str, size: str, 
@@ -132,29 +216,34 @@ def add_pizza_to_order(order_id: int, pizza_flavor: str, size: str,
         
         unit_price = pizza_info['preco']
         
-        return order_api.add_item_to_order(order_id, pizza_flavor, size, crust, quantity, unit_price)
+        prefetcher.discard("order", int(order_id))
+        return order_writer.add_item_to_order(order_id, pizza_flavor, size, crust, quantity, unit_price)
     except Exception as e:
         return {"erro": f"Não foi possível adicionar pizza ao pedido: {str(e)}"}
 
 
 @tool_register(
     name="get_order_total",
+    cache_ttl=30,
+    cache_tag="order_id",
     description="Calcula e retorna o valor total do pedido pelo ID"
 )
 def get_order_total(order_id: int) -> Dict:
     try:
-        return order_api.get_order_total(order_id)
+        return order_api.get_order_total(_resolve_order_id(order_id))
     except Exception as e:
         return {"erro": f"Não foi possível calcular o total do pedido: {str(e)}"}
 
 
 @tool_register(
     name="get_order_items",
+    cache_ttl=30,
+    cache_tag="order_id",
     description="Lista todos os itens (pizzas) que já foram adicionados ao pedido"
 )
 def get_order_items(order_id: int) -> Dict:
     try:
-        items = order_api.get_order_items(order_id)
+        items = order_api.get_order_items(_resolve_order_id(order_id))
         return {"items": items}
     except Exception as e:
         return {"erro": f"Não foi possível obter os itens do pedido: {str(e)}"}
@@ -162,12 +251,14 @@ def get_order_items(order_id: int) -> Dict:
 
 @tool_register(
     name="update_delivery_address",
+    invalidates="order_id",
     description="Atualiza o endereço de entrega do pedido com rua, número, complemento e ponto de referência"
 )
 def update_delivery_address(order_id: int, street_name: str, number: str, 
                           complement: str = None, reference_point: str = None) -> Dict:
     try:
-        return order_api.update_delivery_address(
+        prefetcher.discard("order", int(order_id))
+        return order_writer.update_delivery_address(
             order_id, street_name, number, complement, reference_point
         )
     except Exception as e:
@@ -176,6 +267,7 @@ def update_delivery_address(order_id: int, street_name: str, number: str,
 
 @tool_register(
     name="get_pizza_price",
+    cache_ttl=300,
     description="Retorna o preço específico de uma pizza com sabor, tamanho e borda específicos"
 )
 def get_pizza_price(sabor: str, tamanho: str, borda: str) -> Dict:
@@ -196,21 +288,52 @@ def get_pizza_price(sabor: str, tamanho: str, borda: str) -> Dict:
 
 @tool_register(
     name="remove_item_from_order",
+    invalidates="order_id",
     description="Remove um item específico do pedido pelo ID do item"
 )
 def remove_item_from_order(order_id: int, item_id: int) -> Dict:
     try:
-        return order_api.delete_order_item(order_id, item_id)
+        prefetcher.discard("order", int(order_id))
+        return order_api.delete_order_item(_resolve_order_id(order_id), item_id)
     except Exception as e:
         return {"erro": f"Não foi possível remover item do pedido: {str(e)}"}
 
 
 @tool_register(
     name="get_order",
+    cache_ttl=30,
+    cache_tag="order_id",
     description="Retorna os detalhes do pedido, incluindo pizzas, cliente e endereço"
 )
 def get_order(order_id: int) -> Dict:
+    prefetched = prefetcher.take("order", int(order_id))
+    if prefetched is not None:
+        return prefetched
+    return load_order(order_id)
+
+
+def load_order(order_id: int) -> Dict:
     try:
-        return order_api.get_order(order_id)
+        return order_api.get_order(_resolve_order_id(order_id))
+    except Exception as e:
+        return {"erro": f"Não foi possível obter detalhes do pedido: {str(e)}"}
+
+
+@tool_register(
+    name="quote_cart",
+    description="Calcula de uma vez os preços e o total de uma lista de pizzas (cada item com sabor, tamanho, borda e quantidade). Se o order_id for informado, confere o total com o valor do pedido na API"
+)
+def quote_cart(itens: List[Dict], order_id: int = None) -> Dict:
+    try:
+        quote = knowledge_base.quote_cart(itens)
+        
+        if order_id:
+            server_total = order_api.get_order_total(_resolve_order_id(order_id))["total"]
+            quote["total_servidor"] = float(server_total)
+            quote["total_confere"] = abs(quote["total_servidor"] - quote["total"]) < 0.01
+            if not quote["total_confere"]:
+                event_logger.warning("cart.total_mismatch", order_id=order_id, local_total=quote["total"], server_total=quote["total_servidor"])
+        
+        return quote
     except Exception as e:
-        return {"erro": f"Não foi possível obter detalhes do pedido: {str(e)}"}
\ No newline at end of file
+        return {"erro": f"Não foi possível calcular o carrinho: {str(e)}"}
@@ -1,4 +1,8 @@
 from .order_api import OrderAPI
+from .order_outbox import OrderOutbox
 from .knowledge_base import KnowledgeBase
+from .price_cube import PriceCube
+from .menu_snapshot import MenuSnapshot
+from .menu_watcher import MenuWatcher
 
-__all__ = ['OrderAPI', 'KnowledgeBase']
\ No newline at end of file
+__all__ = ['OrderAPI', 'OrderOutbox', 'KnowledgeBase', 'PriceCube', 'MenuSnapshot', 'MenuWatcher']
@@ -1,7 +1,12 @@
 import sqlite3
 import os
-from typing import List, Dict, Optional
+import threading
+from typing import Callable, List, Dict, Optional
 from difflib import SequenceMatcher
+from utils import event_logger
+from utils.deadline import check_deadline
+from .menu_snapshot import MenuSnapshot, read_menu_rows, summarize_diff
+from .price_cube import PriceCube
 
 
 class KnowledgeBase:
@@ -11,7 +16,13 @@ class KnowledgeBase:
         if not db_path or not os.path.isabs(db_path):
             raise ValueError("Caminho do banco de dados não definido corretamente na variável de ambiente SQLITE_DB_PATH.")
         self.db_path = db_path
+        self.script_path = None
         self._init_database()
+        self._price_cube = None
+        self._price_cube_version = None
+        self._snapshot: Optional[MenuSnapshot] = None
+        self._subscribers: List[Callable[[Dict], None]] = []
+        self._snapshot_lock = threading.Lock()
     
     def _find_best_match(self, search_term: str, candidates: List[Dict], 
                          key_field: str, threshold: float = 0.7, 
@@ -32,7 +43,13 @@ class KnowledgeBase:
         
         if best_match and best_ratio < 1.0:  
             match_value = best_match[key_field]
-            print(f"[KnowledgeBase] Match aproximado ({context}): '{search_term}' → '{match_value}' ({best_ratio:.0%})")
+            event_logger.debug(
+                "kb.fuzzy_match",
+                context=context,
+                search_term=search_term,
+                match=match_value,
+                ratio=round(best_ratio, 3)
+            )
         
         return best_match
     
@@ -42,6 +59,7 @@ class KnowledgeBase:
         
         if self.db_path.endswith('.sql'):
             script_path = self.db_path
+            self.script_path = script_path
             self.db_path = self.db_path.replace('.sql', '.db')
             
             if not os.path.exists(self.db_path):
@@ -52,8 +70,58 @@ class KnowledgeBase:
                 conn.executescript(sql_script)
                 conn.close()
     
+    def _connect(self) -> sqlite3.Connection:
+        check_deadline("consulta ao cardápio")
+        return sqlite3.connect(self.db_path)
+    
+    def load_snapshot(self) -> MenuSnapshot:
+        """Carrega o cardápio inteiro em memória; a partir daqui as consultas não vão ao SQLite"""
+        conn = self._connect()
+        try:
+            rows = read_menu_rows(conn)
+        finally:
+            conn.close()
+        
+        with self._snapshot_lock:
+            version = self._snapshot.version + 1 if self._snapshot else 1
+            self._snapshot = MenuSnapshot(rows, version)
+            snapshot = self._snapshot
+        return snapshot
+    
+    @property
+    def snapshot(self) -> Optional[MenuSnapshot]:
+        return self._snapshot
+    
+    def apply_menu_diff(self, diff: Dict[str, Dict]) -> Optional[MenuSnapshot]:
+        """Aplica uma diferença linha a linha ao cardápio em memória e avisa os interessados"""
+        if not diff:
+            return self._snapshot
+        
+        with self._snapshot_lock:
+            if self._snapshot is None:
+                return None
+            # Troca o snapshot inteiro de uma vez: quem está lendo continua com o antigo
+            self._snapshot = self._snapshot.apply(diff)
+            snapshot = self._snapshot
+        
+        event_logger.info("menu.updated", version=snapshot.version, changes=summarize_diff(diff))
+        for callback in list(self._subscribers):
+            try:
+                callback(diff)
+            except Exception as e:
+                event_logger.error("menu.subscriber_failed", callback=getattr(callback, '__qualname__', repr(callback)), error=str(e))
+        return snapshot
+    
+    def subscribe(self, callback: Callable[[Dict], None]):
+        """Registra uma função chamada com a diferença sempre que o cardápio mudar"""
+        self._subscribers.append(callback)
+    
     def get_all_pizzas(self) -> List[Dict]:
-        conn = sqlite3.connect(self.db_path)
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot.all_pizzas()
+        
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -75,7 +143,17 @@ class KnowledgeBase:
         return pizzas
     
     def get_pizza_by_flavor(self, sabor: str) -> Optional[Dict]:
-        conn = sqlite3.connect(self.db_path)
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot.pizza_by_flavor(sabor) or self._find_best_match(
+                search_term=sabor,
+                candidates=snapshot.all_pizzas(),
+                key_field='sabor',
+                threshold=0.7,
+                context='sabor'
+            )
+        
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -124,7 +202,11 @@ class KnowledgeBase:
         }
     
     def get_sizes(self) -> List[Dict]:
-        conn = sqlite3.connect(self.db_path)
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot.sizes()
+        
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("SELECT id, tamanho FROM tamanhos ORDER BY id")
@@ -140,7 +222,11 @@ class KnowledgeBase:
         return sizes
     
     def get_crusts(self) -> List[Dict]:
-        conn = sqlite3.connect(self.db_path)
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot.crusts()
+        
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("SELECT id, tipo FROM bordas ORDER BY id")
@@ -156,7 +242,11 @@ class KnowledgeBase:
         return crusts
     
     def get_price(self, pizza_id: int, tamanho_id: int, borda_id: int) -> Optional[float]:
-        conn = sqlite3.connect(self.db_path)
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot.price(pizza_id, tamanho_id, borda_id)
+        
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -211,4 +301,86 @@ class KnowledgeBase:
                 'borda': best_crust['tipo'],
                 'preco': preco
             }
-        return None
\ No newline at end of file
+        return None
+    
+    def get_price_grid(self) -> List[tuple]:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot.price_grid()
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT pizza_id, tamanho_id, borda_id, preco FROM precos")
+        
+        grid = cursor.fetchall()
+        conn.close()
+        return grid
+    
+    def get_menu_version(self) -> tuple:
+        """Versão barata do cardápio: a do snapshot em memória ou, sem ele, a do arquivo do banco"""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return ("snapshot", snapshot.version)
+        stat = os.stat(self.db_path)
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def get_price_cube(self) -> PriceCube:
+        version = self.get_menu_version()
+        if self._price_cube is None or self._price_cube_version != version:
+            self._price_cube = PriceCube(
+                self.get_all_pizzas(),
+                self.get_sizes(),
+                self.get_crusts(),
+                self.get_price_grid()
+            )
+            self._price_cube_version = version
+        return self._price_cube
+    
+    def quote_cart(self, items: List[Dict]) -> Dict:
+        """Calcula itens e total de um carrinho inteiro a partir da grade de preços em memória"""
+        cube = self.get_price_cube()
+        
+        resolved = []
+        nao_encontrados = []
+        for item in items:
+            sabor = str(item.get('sabor', ''))
+            pizza = next((p for p in cube.pizzas if p['sabor'].lower() == sabor.lower()), None)
+            pizza = pizza or self._find_best_match(sabor, cube.pizzas, 'sabor', 0.7, 'sabor')
+            size = self._find_best_match(str(item.get('tamanho', '')), cube.sizes, 'tamanho', 0.7, 'tamanho')
+            crust = self._find_best_match(str(item.get('borda') or 'Tradicional'), cube.crusts, 'tipo', 0.6, 'borda')
+            
+            if not pizza or not size or not crust:
+                nao_encontrados.append(item)
+                continue
+            resolved.append((pizza, size, crust, int(item.get('quantidade') or 1)))
+        
+        unit_prices, total = cube.quote([
+            (pizza['id'], size['id'], crust['id'], quantidade)
+            for pizza, size, crust, quantidade in resolved
+        ])
+        
+        itens = []
+        for (pizza, size, crust, quantidade), preco in zip(resolved, unit_prices):
+            if preco is None:
+                nao_encontrados.append({
+                    'sabor': pizza['sabor'],
+                    'tamanho': size['tamanho'],
+                    'borda': crust['tipo'],
+                    'quantidade': quantidade
+                })
+                continue
+            itens.append({
+                'sabor': pizza['sabor'],
+                'tamanho': size['tamanho'],
+                'borda': crust['tipo'],
+                'quantidade': quantidade,
+                'preco_unitario': preco,
+                'subtotal': round(preco * quantidade, 2)
+            })
+        
+        return {
+            'itens': itens,
+            'total': total,
+            'nao_encontrados': nao_encontrados
+        }
@@ -0,0 +1,90 @@
+import sqlite3
+from typing import Dict, List, Optional
+
+
+MENU_QUERIES = {
+    "pizzas": "SELECT id, sabor, descricao, ingredientes FROM pizzas",
+    "tamanhos": "SELECT id, tamanho FROM tamanhos",
+    "bordas": "SELECT id, tipo FROM bordas",
+    "precos": "SELECT pizza_id, tamanho_id, borda_id, preco FROM precos",
+}
+
+
+def read_menu_rows(conn: sqlite3.Connection) -> Dict[str, Dict]:
+    """Lê as tabelas do cardápio, indexando cada linha pela sua chave"""
+    rows = {}
+    for table, query in MENU_QUERIES.items():
+        cursor = conn.execute(query)
+        if table == "pizzas":
+            rows[table] = {
+                r[0]: {'id': r[0], 'sabor': r[1], 'descricao': r[2], 'ingredientes': r[3]}
+                for r in cursor.fetchall()
+            }
+        elif table == "tamanhos":
+            rows[table] = {r[0]: {'id': r[0], 'tamanho': r[1]} for r in cursor.fetchall()}
+        elif table == "bordas":
+            rows[table] = {r[0]: {'id': r[0], 'tipo': r[1]} for r in cursor.fetchall()}
+        else:
+            rows[table] = {(r[0], r[1], r[2]): r[3] for r in cursor.fetchall()}
+    return rows
+
+
+def diff_menu_rows(old: Dict[str, Dict], new: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Diferença linha a linha entre duas leituras do cardápio; tabelas sem mudança ficam de fora"""
+    diff = {}
+    for table in MENU_QUERIES:
+        before, after = old.get(table, {}), new.get(table, {})
+        added = {key: row for key, row in after.items() if key not in before}
+        changed = {key: row for key, row in after.items() if key in before and before[key] != row}
+        removed = [key for key in before if key not in after]
+        if added or changed or removed:
+            diff[table] = {"added": added, "changed": changed, "removed": removed}
+    return diff
+
+
+def summarize_diff(diff: Dict[str, Dict]) -> Dict[str, Dict[str, int]]:
+    return {
+        table: {kind: len(entries) for kind, entries in changes.items()}
+        for table, changes in diff.items()
+    }
+
+
+class MenuSnapshot:
+    """Cópia imutável do cardápio em memória; mudanças geram um novo snapshot"""
+
+    def __init__(self, rows: Dict[str, Dict], version: int = 1):
+        self.rows = rows
+        self.version = version
+
+        self._pizzas = sorted(rows["pizzas"].values(), key=lambda p: p['sabor'])
+        self._pizzas_by_flavor = {p['sabor'].lower(): p for p in self._pizzas}
+        self._sizes = [rows["tamanhos"][key] for key in sorted(rows["tamanhos"])]
+        self._crusts = [rows["bordas"][key] for key in sorted(rows["bordas"])]
+
+    def apply(self, diff: Dict[str, Dict]) -> "MenuSnapshot":
+        rows = {table: dict(entries) for table, entries in self.rows.items()}
+        for table, changes in diff.items():
+            for key in changes["removed"]:
+                rows[table].pop(key, None)
+            rows[table].update(changes["added"])
+            rows[table].update(changes["changed"])
+        return MenuSnapshot(rows, self.version + 1)
+
+    def all_pizzas(self) -> List[Dict]:
+        return [dict(p) for p in self._pizzas]
+
+    def pizza_by_flavor(self, sabor: str) -> Optional[Dict]:
+        pizza = self._pizzas_by_flavor.get(sabor.lower())
+        return dict(pizza) if pizza else None
+
+    def sizes(self) -> List[Dict]:
+        return [dict(s) for s in self._sizes]
+
+    def crusts(self) -> List[Dict]:
+        return [dict(c) for c in self._crusts]
+
+    def price(self, pizza_id: int, tamanho_id: int, borda_id: int) -> Optional[float]:
+        return self.rows["precos"].get((pizza_id, tamanho_id, borda_id))
+
+    def price_grid(self) -> List[tuple]:
+        return [(*key, preco) for key, preco in self.rows["precos"].items()]
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Optional
+
+from utils import event_logger
+from .menu_snapshot import diff_menu_rows, read_menu_rows
+
+
+class MenuWatcher:
+    """Observa o cardápio e atualiza o snapshot em memória da KnowledgeBase.
+
+    A cada ``interval`` segundos faz só checagens baratas: ``PRAGMA
+    data_version`` numa conexão que fica aberta (muda quando outra conexão
+    grava no banco), ``mtime``/tamanho do arquivo do banco (pega a troca do
+    arquivo inteiro) e ``mtime`` do script ``.sql`` de origem, cujo conteúdo
+    só é lido e comparado por hash quando o ``mtime`` muda. Se o script mudou,
+    o banco é reconstruído num arquivo temporário e trocado de forma atômica.
+    Ao detectar mudança, relê as tabelas, calcula a diferença linha a linha e
+    aplica só ela, sem reiniciar o processo.
+    """
+
+    def __init__(self, knowledge_base, interval: float = 2.0):
+        self.knowledge_base = knowledge_base
+        self.interval = interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._data_version = None
+        self._db_stat = None
+        self._script_mtime = None
+        self._script_hash = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refreshes = 0
+        self.rebuilds = 0
+
+    def _open(self):
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = sqlite3.connect(self.knowledge_base.db_path, check_same_thread=False)
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._db_stat = self._stat(self.knowledge_base.db_path)
+
+    @staticmethod
+    def _stat(path: str):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def start(self) -> "MenuWatcher":
+        self.knowledge_base.load_snapshot()
+        self._open()
+
+        script_path = self.knowledge_base.script_path
+        if script_path and os.path.exists(script_path):
+            self._script_mtime = os.stat(script_path).st_mtime_ns
+            self._script_hash = self._hash_file(script_path)
+
+        self._thread = threading.Thread(target=self._run, name="menu-watcher", daemon=True)
+        self._thread.start()
+        event_logger.info("menu.watch_started", interval=self.interval, db_path=self.knowledge_base.db_path)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                event_logger.error("menu.watch_failed", error=str(e))
+
+    def _script_changed(self) -> bool:
+        script_path = self.knowledge_base.script_path
+        if not script_path or not os.path.exists(script_path):
+            return False
+
+        mtime = os.stat(script_path).st_mtime_ns
+        if mtime == self._script_mtime:
+            return False
+        self._script_mtime = mtime
+
+        digest = self._hash_file(script_path)
+        if digest == self._script_hash:
+            return False
+        self._script_hash = digest
+        return True
+
+    def _rebuild_from_script(self):
+        """Gera o banco a partir do script num arquivo temporário e troca de uma vez"""
+        db_path = self.knowledge_base.db_path
+        with open(self.knowledge_base.script_path, 'r', encoding='utf-8') as f:
+            sql_script = f.read()
+
+        fd, tmp_path = tempfile.mkstemp(suffix='.db', dir=os.path.dirname(db_path))
+        os.close(fd)
+        try:
+            conn = sqlite3.connect(tmp_path)
+            try:
+                conn.executescript(sql_script)
+            finally:
+                conn.close()
+            os.replace(tmp_path, db_path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        self.rebuilds += 1
+
+    def check(self) -> Dict[str, Dict]:
+        """Procura mudanças e, havendo, aplica a diferença; devolve a diferença aplicada"""
+        changed = False
+        if self._script_changed():
+            self._rebuild_from_script()
+            changed = True
+
+        db_stat = self._stat(self.knowledge_base.db_path)
+        if changed or db_stat != self._db_stat:
+            self._open()
+            changed = True
+        else:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                self._data_version = data_version
+                changed = True
+
+        if not changed:
+            return {}
+
+        snapshot = self.knowledge_base.snapshot
+        rows = read_menu_rows(self._conn)
+        diff = diff_menu_rows(snapshot.rows if snapshot else {}, rows)
+        if diff:
+            self.knowledge_base.apply_menu_diff(diff)
+            self.refreshes += 1
+        return diff
+
+    def stats(self) -> Dict:
+        snapshot = self.knowledge_base.snapshot
+        return {
+            "interval": self.interval,
+            "version": snapshot.version if snapshot else None,
+            "refreshes": self.refreshes,
+            "rebuilds": self.rebuilds,
+        }
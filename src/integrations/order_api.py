@@ -1,6 +1,7 @@
 import os
 import requests
 from typing import Dict, List, Optional
+from utils.deadline import clamp_timeout
 
 
 class OrderAPI:
@@ -17,18 +18,27 @@ class OrderAPI:
     def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Dict:
         url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
         
+        timeout = clamp_timeout(self.timeout, f"{method} {endpoint}")
+        
         try:
             response = self.session.request(
                 method=method,
                 url=url,
                 json=data,
-                timeout=self.timeout
+                timeout=timeout
             )
             response.raise_for_status()
             return response.json() if response.content else {}
         except requests.RequestException as e:
             raise requests.RequestException(f"Erro na requisição para {url}: {e}")
     
+    def warm_up(self):
+        """Abre (ou mantém viva) a conexão com a API antes da próxima escrita"""
+        try:
+            self.session.get(f"{self.base_url.rstrip('/')}/api/", timeout=self.timeout)
+        except requests.RequestException:
+            pass
+    
     def create_order(self, client_name: str, client_document: str, 
                     delivery_date: str, delivery_address: str = None) -> Dict:
         data = {
@@ -44,22 +54,29 @@ class OrderAPI:
     def get_order(self, order_id: int) -> Dict:
         return self._make_request('GET', f'/api/orders/{order_id}/')
     
-    def add_item_to_order(self, order_id: int, pizza_flavor: str, 
-                         size: str, crust: str, quantity: int = 1, unit_price: float = 0.0) -> Dict:
-
+    def build_item(self, pizza_flavor: str, size: str, crust: str,
+                   quantity: int = 1, unit_price: float = 0.0) -> Dict:
         item_name = f"Pizza {pizza_flavor} {size}"
 
         if crust and crust.lower() != "tradicional":
             item_name += f" - Borda {crust}"
         
-        item_data = {
+        return {
             'name': item_name,
             'quantity': quantity,
             'unit_price': unit_price
         }
+    
+    def add_item_to_order(self, order_id: int, pizza_flavor: str, 
+                         size: str, crust: str, quantity: int = 1, unit_price: float = 0.0) -> Dict:
+
+        item_data = self.build_item(pizza_flavor, size, crust, quantity, unit_price)
         
+        return self.add_items_to_order(order_id, [item_data])
+    
+    def add_items_to_order(self, order_id: int, items: List[Dict]) -> Dict:
         data = {
-            'items': [item_data]
+            'items': items
         }
         
         return self._make_request('PATCH', f'/api/orders/{order_id}/add-items/', data)
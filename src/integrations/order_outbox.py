@@ -0,0 +1,353 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from utils import event_logger
+from utils.deadline import clamp_timeout
+from .order_api import OrderAPI
+
+
+PROVISIONAL_ID_BASE = 900_000_000
+
+
+class OrderOutbox:
+    """Fila local (SQLite) de escritas na Order API, entregue em segundo plano.
+
+    As mutações são confirmadas na hora com um código provisório de pedido;
+    o flusher entrega tudo na ordem, agrupando adições de itens consecutivas
+    em uma única chamada ``add-items/``. Uma entrega que falha é repetida
+    com espera exponencial (``backoff``, dobrando até ``max_backoff``); depois
+    de ``max_attempts`` tentativas ela e as seguintes do pedido ficam como
+    falhas definitivas, guardadas até a conversa avisar o cliente.
+    """
+
+    def __init__(self, order_api: OrderAPI, db_path: str,
+                 flush_interval: float = 0.5, max_attempts: int = 8, backoff: float = 1.0,
+                 max_backoff: float = 60.0, autostart: bool = True):
+        self.order_api = order_api
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._delivered = threading.Condition()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._init_database()
+
+        # Sem autostart, quem usa chama flush() (ex.: testes)
+        self._thread = threading.Thread(target=self._run, name="order-outbox", daemon=True)
+        if autostart:
+            self._thread.start()
+
+    @classmethod
+    def from_env(cls, order_api: OrderAPI) -> Optional["OrderOutbox"]:
+        """Fila em ORDER_OUTBOX_PATH, ou None se a variável não estiver definida"""
+        db_path = os.getenv('ORDER_OUTBOX_PATH')
+        if not db_path:
+            return None
+        return cls(
+            order_api,
+            db_path,
+            max_attempts=int(os.getenv('ORDER_OUTBOX_MAX_ATTEMPTS', '8')),
+            backoff=float(os.getenv('ORDER_OUTBOX_BACKOFF', '1')),
+            max_backoff=float(os.getenv('ORDER_OUTBOX_MAX_BACKOFF', '60')),
+        )
+
+    def _init_database(self):
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS outbox_orders (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    order_id INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS outbox_ops (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    order_key INTEGER NOT NULL,
+                    op TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_outbox_ops_pending
+                    ON outbox_ops (status, order_key, id);
+            """)
+            # Colunas que filas criadas por versões anteriores não têm
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox_ops)")}
+            if "next_attempt_at" not in columns:
+                self._conn.execute("ALTER TABLE outbox_ops ADD COLUMN next_attempt_at REAL NOT NULL DEFAULT 0")
+            if "reported_at" not in columns:
+                self._conn.execute("ALTER TABLE outbox_ops ADD COLUMN reported_at REAL")
+
+    @staticmethod
+    def is_provisional(order_id: int) -> bool:
+        return int(order_id) >= PROVISIONAL_ID_BASE
+
+    def _enqueue(self, order_key: int, op: str, payload: Dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outbox_ops (order_key, op, payload, created_at) VALUES (?, ?, ?, ?)",
+                (int(order_key), op, json.dumps(payload), time.time())
+            )
+        self._wake.set()
+
+    def create_order(self, client_name: str, client_document: str,
+                     delivery_date: str, delivery_address: str = None) -> Dict:
+        with self._lock:
+            cursor = self._conn.execute("INSERT INTO outbox_orders (order_id) VALUES (NULL)")
+            provisional_id = PROVISIONAL_ID_BASE + cursor.lastrowid
+
+        payload = {
+            'client_name': client_name,
+            'client_document': client_document,
+            'delivery_date': delivery_date,
+            'delivery_address': delivery_address,
+        }
+        self._enqueue(provisional_id, 'create_order', payload)
+        event_logger.info("outbox.order_enqueued", provisional_id=provisional_id)
+
+        return {
+            'id': provisional_id,
+            'client_name': client_name,
+            'client_document': client_document,
+            'delivery_date': delivery_date,
+            'items': [],
+            'provisional': True,
+        }
+
+    def add_item_to_order(self, order_id: int, pizza_flavor: str,
+                          size: str, crust: str, quantity: int = 1, unit_price: float = 0.0) -> Dict:
+        item_data = self.order_api.build_item(pizza_flavor, size, crust, quantity, unit_price)
+        self._enqueue(order_id, 'add_items', {'items': [item_data]})
+
+        return {
+            'id': order_id,
+            'items_enfileirados': [item_data],
+            'provisional': True,
+        }
+
+    def update_delivery_address(self, order_id: int, street_name: str,
+                                number: str, complement: str = None,
+                                reference_point: str = None) -> Dict:
+        payload = {
+            'street_name': street_name,
+            'number': number,
+            'complement': complement,
+            'reference_point': reference_point,
+        }
+        self._enqueue(order_id, 'update_address', payload)
+
+        return {
+            'id': order_id,
+            'delivery_address': payload,
+            'provisional': True,
+        }
+
+    def resolve(self, order_id: int) -> Optional[int]:
+        """Retorna o ID real do pedido, ou None se ainda não foi criado na API"""
+        if not self.is_provisional(order_id):
+            return int(order_id)
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT order_id FROM outbox_orders WHERE seq = ?",
+                (int(order_id) - PROVISIONAL_ID_BASE,)
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def _pending_count(self, order_key: int) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM outbox_ops WHERE order_key = ? AND status = 'pending'",
+                (int(order_key),)
+            ).fetchone()
+        return row[0]
+
+    def _order_keys(self, order_id: int) -> tuple:
+        """Chaves da fila de um pedido: o ID pedido e, se for real, o código provisório que virou ele"""
+        order_id = int(order_id)
+        if self.is_provisional(order_id):
+            return (order_id,)
+        with self._lock:
+            row = self._conn.execute("SELECT seq FROM outbox_orders WHERE order_id = ?", (order_id,)).fetchone()
+        return (order_id, PROVISIONAL_ID_BASE + row[0]) if row else (order_id,)
+
+    def failed_ops(self, order_id: int, unreported: bool = False) -> List[Dict]:
+        """Escritas do pedido que falharam de vez, na ordem; entregas posteriores não as apagam"""
+        keys = self._order_keys(order_id)
+        placeholders = ", ".join("?" for _ in keys)
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT id, op, payload, last_error FROM outbox_ops
+                WHERE order_key IN ({placeholders}) AND status = 'failed'
+                  {"AND reported_at IS NULL" if unreported else ""}
+                ORDER BY id
+                """,
+                keys
+            ).fetchall()
+        return [{"id": row[0], "op": row[1], "payload": json.loads(row[2]), "error": row[3]} for row in rows]
+
+    def take_failures(self, order_id: int) -> List[Dict]:
+        """Falhas definitivas ainda não avisadas ao cliente; ficam marcadas como avisadas"""
+        failures = self.failed_ops(order_id, unreported=True)
+        if failures:
+            placeholders = ", ".join("?" for _ in failures)
+            with self._lock:
+                self._conn.execute(
+                    f"UPDATE outbox_ops SET reported_at = ? WHERE id IN ({placeholders})",
+                    (time.time(), *(failure["id"] for failure in failures))
+                )
+        return failures
+
+    def wait_for(self, order_id: int, timeout: float = 30.0) -> int:
+        """Espera as escritas pendentes do pedido serem entregues e retorna o ID real"""
+        deadline = time.monotonic() + clamp_timeout(timeout, f"fila do pedido #{order_id}")
+
+        self._wake.set()
+        with self._delivered:
+            while self._pending_count(order_id) > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Escritas do pedido #{order_id} ainda pendentes na fila local")
+                self._delivered.wait(remaining)
+
+        real_id = self.resolve(order_id)
+        if real_id is None:
+            created = [failure for failure in self.failed_ops(order_id) if failure["op"] == "create_order"]
+            if created:
+                raise RuntimeError(f"Falha ao enviar pedido #{order_id} para a API: {created[0]['error']}")
+            raise RuntimeError(f"Pedido #{order_id} ainda não foi criado na API")
+        return real_id
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                event_logger.error("outbox.flush_error", error=str(e))
+
+    def flush(self):
+        """Entrega as operações pendentes, na ordem, agrupando itens consecutivos"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, order_key, op, payload, attempts, next_attempt_at FROM outbox_ops "
+                "WHERE status = 'pending' ORDER BY id"
+            ).fetchall()
+
+        # Um pedido cuja primeira operação ainda espera a próxima tentativa fica
+        # inteiro para depois, para as escritas dele não saírem fora de ordem
+        now = time.time()
+        ops_by_order: Dict[int, List[tuple]] = {}
+        waiting = set()
+        for row in rows:
+            if row[1] not in ops_by_order and row[5] > now:
+                waiting.add(row[1])
+            if row[1] not in waiting:
+                ops_by_order.setdefault(row[1], []).append(row)
+
+        try:
+            for order_key, ops in ops_by_order.items():
+                self._flush_order(order_key, ops)
+        finally:
+            with self._delivered:
+                self._delivered.notify_all()
+
+    def _flush_order(self, order_key: int, ops: List[tuple]):
+        i = 0
+        while i < len(ops):
+            op_ids = [ops[i][0]]
+            op = ops[i][2]
+            payload = json.loads(ops[i][3])
+            attempts = ops[i][4]
+
+            if op == 'add_items':
+                j = i + 1
+                while j < len(ops) and ops[j][2] == 'add_items':
+                    payload['items'].extend(json.loads(ops[j][3])['items'])
+                    op_ids.append(ops[j][0])
+                    j += 1
+            else:
+                j = i + 1
+
+            try:
+                self._deliver(order_key, op, payload)
+            except Exception as e:
+                self._mark_failed_attempt(order_key, op_ids, attempts + 1, str(e))
+                return
+
+            self._mark(op_ids, 'delivered')
+            i = j
+
+    def _deliver(self, order_key: int, op: str, payload: Dict):
+        if op == 'create_order':
+            new_order = self.order_api.create_order(**payload)
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE outbox_orders SET order_id = ? WHERE seq = ?",
+                    (new_order['id'], order_key - PROVISIONAL_ID_BASE)
+                )
+            event_logger.info("outbox.order_created", provisional_id=order_key, order_id=new_order['id'])
+            return
+
+        order_id = self.resolve(order_key)
+        if order_id is None:
+            raise RuntimeError(f"Pedido provisório #{order_key} sem ID real")
+
+        if op == 'add_items':
+            self.order_api.add_items_to_order(order_id, payload['items'])
+        elif op == 'update_address':
+            self.order_api.update_delivery_address(order_id, **payload)
+        else:
+            raise ValueError(f"Operação desconhecida na fila: {op}")
+
+    def _mark(self, op_ids: List[int], status: str, error: str = None):
+        placeholders = ", ".join("?" for _ in op_ids)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE outbox_ops SET status = ?, last_error = ? WHERE id IN ({placeholders})",
+                (status, error, *op_ids)
+            )
+
+    def _mark_failed_attempt(self, order_key: int, op_ids: List[int], attempts: int, error: str):
+        event_logger.warning("outbox.delivery_failed", provisional_id=order_key, attempts=attempts, error=error)
+        placeholders = ", ".join("?" for _ in op_ids)
+        delay = min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE outbox_ops SET attempts = ?, last_error = ?, next_attempt_at = ? WHERE id IN ({placeholders})",
+                (attempts, error, time.time() + delay, *op_ids)
+            )
+            if attempts >= self.max_attempts:
+                # Sem a operação que falhou, as próximas do mesmo pedido não fazem sentido
+                self._conn.execute(
+                    "UPDATE outbox_ops SET status = 'failed', last_error = COALESCE(last_error, ?) "
+                    "WHERE order_key = ? AND status = 'pending'",
+                    (error, int(order_key))
+                )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM outbox_ops GROUP BY status"
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval * 2)
+        self._conn.close()
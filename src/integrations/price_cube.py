@@ -0,0 +1,69 @@
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class PriceCube:
+    """Grade de preços densa indexada por (pizza, tamanho, borda).
+
+    Os preços ficam em um único ``array('d')`` contíguo; combinações sem
+    preço cadastrado guardam NaN.
+    """
+
+    def __init__(self, pizzas: List[Dict], sizes: List[Dict], crusts: List[Dict],
+                 prices: Iterable[Tuple[int, int, int, float]]):
+        self.pizzas = pizzas
+        self.sizes = sizes
+        self.crusts = crusts
+
+        self._pizza_index = {p['id']: i for i, p in enumerate(pizzas)}
+        self._size_index = {s['id']: i for i, s in enumerate(sizes)}
+        self._crust_index = {c['id']: i for i, c in enumerate(crusts)}
+
+        self._prices = array('d', [math.nan]) * (len(pizzas) * len(sizes) * len(crusts))
+        for pizza_id, size_id, crust_id, preco in prices:
+            offset = self._offset(pizza_id, size_id, crust_id)
+            if offset is not None:
+                self._prices[offset] = preco
+
+    def _offset(self, pizza_id: int, size_id: int, crust_id: int) -> Optional[int]:
+        i = self._pizza_index.get(pizza_id)
+        j = self._size_index.get(size_id)
+        k = self._crust_index.get(crust_id)
+        if i is None or j is None or k is None:
+            return None
+        return (i * len(self.sizes) + j) * len(self.crusts) + k
+
+    def price(self, pizza_id: int, size_id: int, crust_id: int) -> Optional[float]:
+        offset = self._offset(pizza_id, size_id, crust_id)
+        if offset is None or math.isnan(self._prices[offset]):
+            return None
+        return self._prices[offset]
+
+    def prices_for_pizza(self, pizza_id: int) -> List[Tuple[Dict, Dict, float]]:
+        """Retorna (tamanho, borda, preço) de todas as combinações com preço da pizza"""
+        i = self._pizza_index.get(pizza_id)
+        if i is None:
+            return []
+
+        stride = len(self.sizes) * len(self.crusts)
+        block = self._prices[i * stride:(i + 1) * stride]
+        return [
+            (self.sizes[n // len(self.crusts)], self.crusts[n % len(self.crusts)], preco)
+            for n, preco in enumerate(block)
+            if not math.isnan(preco)
+        ]
+
+    def quote(self, lines: List[Tuple[int, int, int, int]]) -> Tuple[List[Optional[float]], float]:
+        """Calcula preço unitário de cada linha (pizza_id, tamanho_id, borda_id, quantidade) e o total"""
+        offsets = [self._offset(p, s, c) for p, s, c, _ in lines]
+        unit_prices = [
+            None if offset is None or math.isnan(self._prices[offset]) else self._prices[offset]
+            for offset in offsets
+        ]
+        total = math.fsum(
+            preco * quantidade
+            for preco, (_, _, _, quantidade) in zip(unit_prices, lines)
+            if preco is not None
+        )
+        return unit_prices, round(total, 2)
@@ -0,0 +1,5 @@
+from .stubs import StubModelAgent, StubOrderServer
+from .scenarios import build_dialogue
+from .runner import isolated_caches, run_load_test, run_step
+
+__all__ = ['StubModelAgent', 'StubOrderServer', 'build_dialogue', 'isolated_caches', 'run_load_test', 'run_step']
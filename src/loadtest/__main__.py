@@ -0,0 +1,63 @@
+import argparse
+import json
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+env_path = Path(__file__).parent.parent.parent / '.env'
+if env_path.exists():
+    load_dotenv(env_path)
+else:
+    load_dotenv()
+
+from .runner import REPORT_HEADER, format_report, run_load_test
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do chatbot com modelo e Order API substitutos")
+    parser.add_argument("--steps", default="10,100,500,1000", help="degraus de concorrência, separados por vírgula")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model-latency", type=float, default=0.2, help="latência média do modelo substituto (s)")
+    parser.add_argument("--jitter", type=float, default=0.5, help="variação relativa da latência do modelo")
+    parser.add_argument("--api-latency", type=float, default=0.01, help="latência da Order API substituta (s)")
+    parser.add_argument("--rpm", type=int, help="limite de requisições por minuto do agendador")
+    parser.add_argument("--tpm", type=int, help="limite de tokens por minuto do agendador")
+    parser.add_argument("--max-concurrency", type=int, help="chamadas simultâneas ao modelo")
+    parser.add_argument("--no-memory", action="store_true", help="não medir memória (tracemalloc deixa tudo mais lento)")
+    parser.add_argument("--shared-caches", action="store_true", help="mantém o cache de respostas e a busca antecipada ligados")
+    parser.add_argument("--json", type=Path, help="grava os resultados em JSON lines")
+    args = parser.parse_args()
+
+    scheduler_limits = {
+        key: value
+        for key, value in {
+            "requests_per_minute": args.rpm,
+            "tokens_per_minute": args.tpm,
+            "max_concurrency": args.max_concurrency,
+        }.items()
+        if value is not None
+    }
+
+    print(REPORT_HEADER)
+    output = args.json.open("w", encoding="utf-8") if args.json else None
+    try:
+        for result in run_load_test(
+            steps=[int(step) for step in args.steps.split(",")],
+            seed=args.seed,
+            model_latency=args.model_latency,
+            jitter=args.jitter,
+            api_latency=args.api_latency,
+            measure_memory=not args.no_memory,
+            scheduler_limits=scheduler_limits,
+            shared_caches=args.shared_caches,
+        ):
+            print(format_report(result), flush=True)
+            if output:
+                output.write(json.dumps(result) + "\n")
+    finally:
+        if output:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+import gc
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional
+
+from .scenarios import build_dialogue
+from .stubs import StubModelAgent, StubOrderServer
+
+
+ERROR_PREFIXES = ("Desculpe, ocorreu um erro",)
+REJECTED_PREFIXES = ("Estamos com muitos pedidos",)
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percentile / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _run_session(bella, dialogue: List[Dict], latencies: List[float], outcome: Dict, lock: threading.Lock):
+    errors = rejected = 0
+    session_latencies = []
+    for step in dialogue:
+        started = time.perf_counter()
+        try:
+            response = bella.chat(step["message"])
+        except Exception:
+            response = ERROR_PREFIXES[0]
+        session_latencies.append(time.perf_counter() - started)
+
+        if response.startswith(ERROR_PREFIXES):
+            errors += 1
+        elif response.startswith(REJECTED_PREFIXES):
+            rejected += 1
+
+    with lock:
+        latencies.extend(session_latencies)
+        outcome["turns"] += len(session_latencies)
+        outcome["errors"] += errors
+        outcome["rejected"] += rejected
+        outcome["tool_errors"] += bella.agent.tool_errors
+        outcome["finalized"] += bella.conversation_state["estado"] == bella.ESTADO_FINALIZADO
+
+
+@contextmanager
+def isolated_caches():
+    """Desliga, durante o bloco, o cache de respostas e a busca antecipada, que são do processo.
+
+    Com eles, uma conversa poderia receber respostas ou dados de outra, e o
+    resultado dependeria do número de sessões e da ordem em que rodam; no
+    teste de carga, turnos servidos pelo cache também esconderiam o custo real.
+    """
+    from agent import prefetcher, response_cache
+
+    saved = response_cache.max_entries, prefetcher.enabled
+    response_cache.max_entries = 0
+    response_cache.invalidate()
+    prefetcher.enabled = False
+    prefetcher.clear()
+    try:
+        yield
+    finally:
+        response_cache.max_entries, prefetcher.enabled = saved
+
+
+def run_step(concurrency: int, seed: int, model_latency: float, jitter: float,
+             measure_memory: bool = True) -> Dict:
+    """Roda ``concurrency`` conversas completas ao mesmo tempo e mede o resultado"""
+    from agent import BeautyPizzaAgent, tools
+
+    gc.collect()
+    if measure_memory:
+        baseline = tracemalloc.get_traced_memory()[0]
+
+    sessions = []
+    for index in range(concurrency):
+        rng = random.Random(f"{seed}:{concurrency}:{index}")
+        dialogue = build_dialogue(rng, tools.knowledge_base)
+        bella = BeautyPizzaAgent("stub", session_id=f"load-{concurrency}-{index}")
+        bella.agent = StubModelAgent(dialogue, latency=model_latency, jitter=jitter, rng=rng)
+        sessions.append((bella, dialogue))
+
+    latencies: List[float] = []
+    outcome = {"turns": 0, "errors": 0, "rejected": 0, "tool_errors": 0, "finalized": 0}
+    lock = threading.Lock()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load-session") as executor:
+        futures = [
+            executor.submit(_run_session, bella, dialogue, latencies, outcome, lock)
+            for bella, dialogue in sessions
+        ]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    memory_per_session = None
+    if measure_memory:
+        gc.collect()
+        memory_per_session = (tracemalloc.get_traced_memory()[0] - baseline) / concurrency
+
+    return {
+        "concurrency": concurrency,
+        "sessions": concurrency,
+        "turns": outcome["turns"],
+        "seconds": round(elapsed, 3),
+        "throughput": round(outcome["turns"] / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+        "error_rate": round(outcome["errors"] / outcome["turns"], 4) if outcome["turns"] else 0.0,
+        "rejected_rate": round(outcome["rejected"] / outcome["turns"], 4) if outcome["turns"] else 0.0,
+        "tool_errors": outcome["tool_errors"],
+        "finalized": outcome["finalized"],
+        "memory_per_session_kb": round(memory_per_session / 1024, 1) if memory_per_session is not None else None,
+    }
+
+
+def run_load_test(steps: List[int], seed: int = 42, model_latency: float = 0.2,
+                  jitter: float = 0.5, api_latency: float = 0.01,
+                  measure_memory: bool = True, scheduler_limits: Optional[Dict] = None,
+                  shared_caches: bool = False) -> Iterator[Dict]:
+    """Sobe a concorrência degrau a degrau contra o modelo e a Order API substitutos.
+
+    Gera o resultado de cada degrau assim que ele termina. O cache de
+    respostas e a busca antecipada ficam desligados, como na reexecução em
+    lote; ``shared_caches`` os mantém.
+    """
+    from agent import model_router, model_scheduler, tool_cache, tools
+
+    server = StubOrderServer(latency=api_latency).start()
+    tools.order_api.base_url = server.url
+    if scheduler_limits:
+        model_scheduler.configure(**scheduler_limits)
+
+    if measure_memory:
+        tracemalloc.start()
+
+    try:
+        for concurrency in steps:
+            with (nullcontext() if shared_caches else isolated_caches()):
+                result = run_step(concurrency, seed, model_latency, jitter, measure_memory)
+            result["scheduler"] = model_scheduler.stats()
+            result["models"] = model_router.stats()
+            result["tool_cache"] = tool_cache.stats()
+            yield result
+    finally:
+        if measure_memory:
+            tracemalloc.stop()
+        server.stop()
+
+
+def format_report(result: Dict) -> str:
+    memory = f"{result['memory_per_session_kb']:>9.1f}" if result['memory_per_session_kb'] is not None else f"{'-':>9}"
+    return (
+        f"{result['concurrency']:>7} {result['turns']:>7} {result['throughput']:>10.1f} "
+        f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['error_rate']:>7.2%} "
+        f"{result['rejected_rate']:>8.2%} {result['finalized']:>7} {memory}"
+    )
+
+
+REPORT_HEADER = f"{'sessões':>7} {'turnos':>7} {'turnos/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'erros':>7} {'recusas':>8} {'finaliz.':>7} {'KB/sessão':>9}"
@@ -0,0 +1,103 @@
+import random
+from typing import Dict, List
+
+from integrations import KnowledgeBase
+
+
+NOMES = ["Ana Souza", "Bruno Lima", "Carla Dias", "Diego Alves", "Elisa Rocha", "Fábio Nunes"]
+RUAS = ["Rua das Flores", "Avenida Brasil", "Rua Augusta", "Avenida Paulista", "Rua do Sol"]
+SAUDACOES = ["Oi, boa noite!", "Olá!", "Boa tarde", "Oi Bella, tudo bem?"]
+
+
+def _cpf(rng: random.Random) -> str:
+    digits = [rng.randint(0, 9) for _ in range(9)]
+    for size in (9, 10):
+        total = sum(d * (size + 1 - i) for i, d in enumerate(digits[:size]))
+        digits.append((total * 10 % 11) % 10)
+    return "".join(map(str, digits))
+
+
+def build_dialogue(rng: random.Random, knowledge_base: KnowledgeBase) -> List[Dict]:
+    """Monta um diálogo roteirizado que passa por todos os estados, de INICIAL a FINALIZADO.
+
+    Cada passo traz a mensagem do cliente, as ferramentas que o modelo
+    substituto deve chamar e a resposta dele.
+    """
+    cube = knowledge_base.get_price_cube()
+    pizzas = []
+    for _ in range(rng.randint(1, 3)):
+        pizza = rng.choice(cube.pizzas)
+        size, crust, _ = rng.choice(cube.prices_for_pizza(pizza['id']))
+        pizzas.append({
+            "sabor": pizza['sabor'],
+            "tamanho": size['tamanho'],
+            "borda": crust['tipo'],
+            "quantidade": rng.randint(1, 2),
+        })
+
+    nome = rng.choice(NOMES)
+    documento = _cpf(rng)
+    rua = rng.choice(RUAS)
+    numero = str(rng.randint(1, 2000))
+
+    escolha = " e ".join(f"{p['quantidade']} {p['sabor']} {p['tamanho']} borda {p['borda']}" for p in pizzas)
+
+    return [
+        {
+            "message": rng.choice(SAUDACOES),
+            "reply": "Olá! Bem-vindo à Beauty Pizza! Já sabe o que vai pedir ou quer ver o cardápio?",
+        },
+        {
+            "message": "Quero ver o cardápio, por favor",
+            "tools": [("get_menu", {})],
+            "reply": "Aqui está nosso cardápio! Qual pizza te agrada?",
+        },
+        {
+            "message": f"Quero {escolha}",
+            "tools": [
+                call
+                for p in pizzas
+                for call in (
+                    ("get_pizza_info", {"sabor": p["sabor"]}),
+                    ("get_pizza_price", {"sabor": p["sabor"], "tamanho": p["tamanho"], "borda": p["borda"]}),
+                )
+            ],
+            "reply": "Ótima escolha! Deseja mais alguma pizza?",
+        },
+        {
+            "message": "Só isso",
+            "tools": [("quote_cart", {"itens": pizzas})],
+            "reply": "Perfeito! Qual o seu nome e CPF?",
+        },
+        {
+            "message": f"{nome}, {documento}",
+            "reply": "Obrigada! Qual o endereço de entrega?",
+        },
+        {
+            "message": f"{rua}, {numero}, pode finalizar",
+            "reply": "Tudo certo! Vou registrar seu pedido.",
+        },
+        {
+            "message": "Sim, confirma",
+            "tools": [("create_order", {"client_name": nome, "client_document": documento})]
+            + [
+                ("add_pizza_to_order", {
+                    "order_id": "$order_id",
+                    "pizza_flavor": p["sabor"],
+                    "size": p["tamanho"],
+                    "crust": p["borda"],
+                    "quantity": p["quantidade"],
+                })
+                for p in pizzas
+            ]
+            + [
+                ("update_delivery_address", {"order_id": "$order_id", "street_name": rua, "number": numero}),
+                ("get_order", {"order_id": "$order_id"}),
+            ],
+            "reply": "🎉 Pedido #{order_id} criado com sucesso! Logo chega aí.",
+        },
+        {
+            "message": "Obrigado!",
+            "reply": "Nós que agradecemos! Bom apetite! 🍕",
+        },
+    ]
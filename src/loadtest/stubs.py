@@ -0,0 +1,205 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # A fila padrão do listen (5) derruba conexões em rajadas de muitas sessões
+    request_queue_size = 1024
+
+
+class StubOrderServer:
+    """Order API local e em memória, com latência configurável.
+
+    Implementa apenas os endpoints usados pelo ``OrderAPI``.
+    """
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self._orders: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+        self._next_order_id = 1
+        self._next_item_id = 1
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: Optional[Dict] = None):
+                payload = json.dumps(body).encode('utf-8') if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _body(self) -> Dict:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length)) if length else {}
+
+            def _handle(self, method: str):
+                if server.latency:
+                    time.sleep(server.latency)
+                status, body = server.handle(method, self.path, self._body())
+                self._send(status, body)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+            def do_DELETE(self):
+                self._handle("DELETE")
+
+        self._httpd = _StubHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-order-api", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubOrderServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    @staticmethod
+    def _total(order: Dict) -> str:
+        total = sum(item['quantity'] * float(item['unit_price']) for item in order['items'])
+        return f"{total:.2f}"
+
+    def handle(self, method: str, path: str, data: Dict) -> tuple:
+        path = path.rstrip('/') + '/'
+        with self._lock:
+            if method == "GET" and path == "/api/":
+                return 200, {"status": "ok"}
+
+            if method == "POST" and path == "/api/orders/":
+                order = {
+                    "id": self._next_order_id,
+                    "client_name": data.get("client_name"),
+                    "client_document": data.get("client_document"),
+                    "delivery_date": data.get("delivery_date"),
+                    "delivery_address": None,
+                    "items": [],
+                }
+                self._next_order_id += 1
+                order["total_price"] = self._total(order)
+                self._orders[order["id"]] = order
+                return 201, order
+
+            match = re.fullmatch(r"/api/orders/(\d+)/(?:(add-items|update-address)/|items/(\d+)/)?", path)
+            order = self._orders.get(int(match.group(1))) if match else None
+            if not order:
+                return 404, {"detail": "Not found."}
+
+            action, item_id = match.group(2), match.group(3)
+            if method == "GET" and not action and not item_id:
+                pass
+            elif method == "PATCH" and action == "add-items":
+                for item in data.get("items", []):
+                    order["items"].append({"id": self._next_item_id, **item})
+                    self._next_item_id += 1
+            elif method == "PATCH" and action == "update-address":
+                order["delivery_address"] = data.get("delivery_address")
+            elif method == "DELETE" and item_id:
+                order["items"] = [item for item in order["items"] if item["id"] != int(item_id)]
+            else:
+                return 405, {"detail": "Method not allowed."}
+
+            order["total_price"] = self._total(order)
+            return 200, order
+
+
+class StubRunResponse:
+
+    def __init__(self, content: str, tools: List[Dict], input_tokens: int, output_tokens: int):
+        self.content = content
+        self.tools = tools
+        self.metrics = {
+            "input_tokens": [input_tokens],
+            "output_tokens": [output_tokens],
+            "total_tokens": [input_tokens + output_tokens],
+        }
+
+
+class StubModelAgent:
+    """Substitui o ``agno.Agent`` de um ``BeautyPizzaAgent`` por um modelo roteirizado.
+
+    Cada mensagem recebida consome o próximo passo do roteiro: espera a
+    latência configurada, chama de verdade as ferramentas previstas e devolve
+    a resposta do roteiro, como um modelo faria.
+    """
+
+    def __init__(self, script: List[Dict], latency: float = 0.2, jitter: float = 0.5,
+                 rng: Optional[random.Random] = None):
+        self.script = list(script)
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+
+        self.instructions = ""
+        self.model = None
+        self.tools = None
+        self.variables: Dict = {}
+        self.tool_errors = 0
+        self._step = 0
+
+    def set_tools(self, tools):
+        self.tools = tools
+
+    def _call_tool(self, name: str, kwargs: Dict):
+        from agent import TOOLS_REGISTRY, tools
+
+        function = TOOLS_REGISTRY.get(name)
+        entrypoint = getattr(function, "entrypoint", None) or getattr(tools, name)
+        kwargs = {
+            key: self.variables.get(value[1:], value) if isinstance(value, str) and value.startswith("$") else value
+            for key, value in kwargs.items()
+        }
+        return entrypoint(**kwargs)
+
+    def _next_step(self, message: str) -> Dict:
+        # Rodadas atendidas pelo cache de respostas não chegam aqui, então o
+        # passo é achado pela mensagem (que pode vir com o contexto do pedido na frente)
+        for index in range(self._step, len(self.script)):
+            if message.endswith(self.script[index]["message"]):
+                self._step = index + 1
+                return self.script[index]
+        step = self.script[min(self._step, len(self.script) - 1)]
+        self._step += 1
+        return step
+
+    def run(self, message: str) -> StubRunResponse:
+        step = self._next_step(message)
+
+        time.sleep(max(0.0, self.latency * (1 + self.rng.uniform(-self.jitter, self.jitter))))
+
+        calls = []
+        for name, kwargs in step.get("tools", []):
+            result = self._call_tool(name, kwargs)
+            if isinstance(result, dict) and "erro" in result:
+                self.tool_errors += 1
+            if name == "create_order" and isinstance(result, dict) and result.get("id"):
+                self.variables["order_id"] = result["id"]
+            calls.append({"tool_name": name, "tool_args": kwargs})
+
+        content = step.get("reply", "Certo!").format(**self.variables)
+        return StubRunResponse(content, calls, (len(self.instructions) + len(message)) // 4, len(content) // 4)
@@ -1,7 +1,10 @@
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 
+import argparse
+import json
 import os
+import sys
 import time
 from pathlib import Path
 from dotenv import load_dotenv
@@ -13,12 +16,73 @@ else:
     load_dotenv()  
 
 from agent import BeautyPizzaAgent
+from utils import turn_profiler
+from utils.events import WARNING, event_logger
 
 
-def main():
-    print("🍕 Bem-vindo ao sistema da Beauty Pizza! 🍕")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Chat da Beauty Pizza (interativo ou reexecução em lote)")
+    parser.add_argument("--batch", type=Path, help="JSONL de conversas gravadas para reexecutar em lote")
+    parser.add_argument("--output", type=Path, help="JSONL de saída com turnos e estados finais (padrão: stdout)")
+    parser.add_argument("--workers", type=int, default=8, help="conversas simultâneas no modo em lote")
+    parser.add_argument("--stub-model", action="store_true", help="usa o modelo substituto do teste de carga, sem chamar a OpenAI")
+    parser.add_argument("--stub-api", action="store_true", help="usa uma Order API local em memória")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="latência do modelo substituto (s)")
+    parser.add_argument("--rpm", type=int, help="limite de requisições por minuto ao modelo no modo em lote")
+    parser.add_argument("--tpm", type=int, help="limite de tokens por minuto ao modelo no modo em lote")
+    parser.add_argument("--shared-caches", action="store_true", help="mantém o cache de respostas e a busca antecipada entre as conversas do lote")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def run_batch(args, openai_api_key):
+    from replay import run_replay
     
+    output = args.output.open("w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        summary = run_replay(
+            str(args.batch),
+            output,
+            workers=args.workers,
+            openai_api_key=openai_api_key,
+            stub_model=args.stub_model,
+            stub_api=args.stub_api,
+            model_latency=args.model_latency,
+            seed=args.seed,
+            scheduler_limits={
+                key: value
+                for key, value in {"requests_per_minute": args.rpm, "tokens_per_minute": args.tpm}.items()
+                if value is not None
+            },
+            shared_caches=args.shared_caches,
+        )
+    finally:
+        if args.output:
+            output.close()
+    
+    print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
+    return summary
+
+
+def main(argv=None):
+    args = parse_args(argv)
     openai_api_key = os.getenv('OPENAI_API_KEY')
+    
+    if args.batch:
+        if not openai_api_key and not args.stub_model:
+            print("❌ Erro: OPENAI_API_KEY não configurada! (use --stub-model para reexecutar sem a OpenAI)", file=sys.stderr)
+            sys.exit(1)
+        summary = run_batch(args, openai_api_key)
+        sys.exit(1 if summary["failed"] else 0)
+    
+    print("🍕 Bem-vindo ao sistema da Beauty Pizza! 🍕")
+    turn_profiler.install_signal_handler()
+    
+    # Sem EVENT_LOG_PATH os eventos iriam para o stderr, no meio do diálogo;
+    # no chat interativo só avisos e erros saem ali, a não ser que LOG_LEVEL peça outro nível
+    if not os.getenv('EVENT_LOG_PATH') and not os.getenv('LOG_LEVEL'):
+        event_logger.set_level(WARNING)
+    
     if not openai_api_key:
         print("❌ Erro: OPENAI_API_KEY não configurada!")
         print("Por favor, configure sua chave da API do OpenAI no arquivo .env")
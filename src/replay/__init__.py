@@ -0,0 +1,3 @@
+from .runner import load_conversations, replay_conversation, run_replay
+
+__all__ = ['load_conversations', 'replay_conversation', 'run_replay']
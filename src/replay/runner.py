@@ -0,0 +1,156 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, Iterator, List, Optional, TextIO
+
+
+def _normalize_turns(turns: List) -> List[Dict]:
+    return [turn if isinstance(turn, dict) else {"message": turn} for turn in turns]
+
+
+def load_conversations(path: str) -> Iterator[Dict]:
+    """Lê conversas gravadas de um JSONL, uma por linha.
+
+    Cada linha traz ``turns`` (ou ``messages``): mensagens do cliente, como
+    texto ou como passos ``{"message", "tools", "reply"}`` para o modelo
+    substituto. Opcionalmente, ``id`` e ``expected`` (campos esperados no
+    ``conversation_state`` final).
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            conversation = json.loads(line)
+            yield {
+                "id": str(conversation.get("id", line_number)),
+                "turns": _normalize_turns(conversation.get("turns") or conversation.get("messages") or []),
+                "expected": conversation.get("expected") or {},
+            }
+
+
+class _JsonlWriter:
+
+    def __init__(self, output: TextIO):
+        self.output = output
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+
+def replay_conversation(conversation: Dict, openai_api_key: Optional[str] = None, stub_model: bool = False,
+                        model_latency: float = 0.0, seed: int = 42, emit=None) -> Dict:
+    """Roda uma conversa inteira numa sessão própria e devolve o resultado final.
+
+    ``emit`` recebe o registro de cada turno assim que ele termina.
+    """
+    from agent import BeautyPizzaAgent
+
+    session_id = f"replay-{conversation['id']}"
+    bella = BeautyPizzaAgent(openai_api_key or "stub", session_id=session_id)
+    if stub_model:
+        from loadtest import StubModelAgent
+        rng = random.Random(f"{seed}:{conversation['id']}")
+        bella.agent = StubModelAgent(conversation["turns"], latency=model_latency, jitter=0.0, rng=rng)
+
+    started = time.perf_counter()
+    errors = 0
+    for index, turn in enumerate(conversation["turns"]):
+        turn_started = time.perf_counter()
+        try:
+            response = bella.chat(turn["message"])
+            error = None
+        except Exception as e:
+            response, error = None, str(e)
+        if error or (response or "").startswith("Desculpe, ocorreu um erro"):
+            errors += 1
+
+        if emit:
+            emit({
+                "type": "turn",
+                "conversation_id": conversation["id"],
+                "turn": index,
+                "message": turn["message"],
+                "response": response,
+                "estado": bella.conversation_state["estado"],
+                "latency_ms": round((time.perf_counter() - turn_started) * 1000, 1),
+                "error": error,
+            })
+
+    state = bella.conversation_state
+    mismatches = {
+        key: {"esperado": value, "obtido": state.get(key)}
+        for key, value in conversation["expected"].items()
+        if state.get(key) != value
+    }
+    return {
+        "type": "conversation",
+        "conversation_id": conversation["id"],
+        "turns": len(conversation["turns"]),
+        "errors": errors,
+        "tool_errors": getattr(bella.agent, "tool_errors", 0),
+        "seconds": round(time.perf_counter() - started, 3),
+        "passed": not mismatches and not errors,
+        "mismatches": mismatches,
+        "state": state,
+    }
+
+
+def run_replay(input_path: str, output: TextIO, workers: int = 8, openai_api_key: Optional[str] = None,
+               stub_model: bool = False, stub_api: bool = False, model_latency: float = 0.0,
+               seed: int = 42, scheduler_limits: Optional[Dict] = None, shared_caches: bool = False) -> Dict:
+    """Reexecuta em paralelo as conversas de um JSONL, gravando turnos e estados finais em JSONL.
+
+    Cada conversa tem seu próprio ``BeautyPizzaAgent`` (sessão isolada);
+    ``workers`` conversas rodam ao mesmo tempo. Com ``stub_model`` o modelo
+    é o substituto do teste de carga, que segue os passos gravados, e com
+    ``stub_api`` a Order API é a local em memória. O cache de respostas e a
+    busca antecipada ficam desligados, para cada conversa passar pelo modelo e
+    pelas ferramentas; ``shared_caches`` os mantém (ex.: para medir vazão).
+    """
+    if scheduler_limits:
+        from agent import model_scheduler
+        model_scheduler.configure(**scheduler_limits)
+
+    server = None
+    if stub_api:
+        from agent import tools
+        from loadtest import StubOrderServer
+        server = StubOrderServer().start()
+        tools.order_api.base_url = server.url
+
+    writer = _JsonlWriter(output)
+    summary = {"conversations": 0, "passed": 0, "failed": 0, "turns": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def run(conversation: Dict):
+        result = replay_conversation(conversation, openai_api_key, stub_model, model_latency, seed, writer.write)
+        writer.write(result)
+        with lock:
+            summary["conversations"] += 1
+            summary["turns"] += result["turns"]
+            summary["errors"] += result["errors"]
+            summary["passed" if result["passed"] else "failed"] += 1
+
+    from loadtest import isolated_caches
+
+    started = time.perf_counter()
+    try:
+        with (nullcontext() if shared_caches else isolated_caches()):
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="replay") as executor:
+                for future in [executor.submit(run, c) for c in load_conversations(input_path)]:
+                    future.result()
+    finally:
+        if server:
+            server.stop()
+
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = round(elapsed, 3)
+    summary["turns_per_second"] = round(summary["turns"] / elapsed, 2) if elapsed else 0.0
+    return summary
@@ -1,4 +1,7 @@
 
 from .setup import setup_database, test_api_connection, validate_environment
+from .events import EventLogger, event_logger
+from .profiler import TurnProfiler, turn_profiler
+from .deadline import Deadline, DeadlineExceeded, deadline_scope
 
-__all__ = ['setup_database', 'test_api_connection', 'validate_environment']
\ No newline at end of file
+__all__ = ['setup_database', 'test_api_connection', 'validate_environment', 'EventLogger', 'event_logger', 'TurnProfiler', 'turn_profiler', 'Deadline', 'DeadlineExceeded', 'deadline_scope']
\ No newline at end of file
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """O tempo do turno acabou antes do trabalho terminar"""
+
+
+class Deadline:
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.cancelled = False
+
+    def remaining(self) -> float:
+        if self.cancelled:
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def cancel(self):
+        """Encerra o prazo na hora; o trabalho em andamento desiste no próximo ponto de checagem"""
+        self.cancelled = True
+
+    def check(self, what: str = ""):
+        if self.expired:
+            raise DeadlineExceeded(f"Tempo do turno esgotado{f' em {what}' if what else ''}")
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+_misses_lock = threading.Lock()
+_misses: Counter = Counter()
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Define o prazo do turno para tudo que rodar dentro do bloco (inclusive threads com o contexto copiado)"""
+    deadline = Deadline(seconds) if seconds else None
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def check_deadline(what: str = ""):
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check(what)
+
+
+def clamp_timeout(timeout: float, what: str = "") -> float:
+    """Limita um timeout de E/S ao tempo que ainda resta no turno"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return timeout
+    deadline.check(what)
+    return min(timeout, deadline.remaining())
+
+
+def record_deadline_miss(label: str):
+    with _misses_lock:
+        _misses[label] += 1
+
+
+def deadline_misses() -> Dict[str, int]:
+    with _misses_lock:
+        return dict(_misses)
@@ -0,0 +1,176 @@
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, TextIO
+
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "debug", INFO: "info", WARNING: "warning", ERROR: "error"}
+
+# Campos da conversa atual (session_id, estado, trace_id...) anexados a todo evento
+_event_context: ContextVar[Dict] = ContextVar("event_context", default={})
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+class EventLogger:
+    """Log estruturado em JSON lines, escrito por uma thread em segundo plano.
+
+    Quem registra um evento só monta um dicionário e o coloca na fila; a
+    escrita acontece em lotes fora da thread da requisição. Os métodos de
+    níveis desativados são trocados por uma função vazia, então não custam
+    nada além da chamada.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, level: int = INFO,
+                 sample_rates: Optional[Dict[str, float]] = None,
+                 batch_size: int = 200, flush_interval: float = 0.2,
+                 max_queue: int = 10_000):
+        self.stream = stream or sys.stderr
+        self.sample_rates = sample_rates or {}
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue(maxsize=max_queue)
+        self._dropped = 0
+        self._random = random.Random()
+
+        self.set_level(level)
+
+        self._thread = threading.Thread(target=self._run, name="event-logger", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls) -> "EventLogger":
+        level_name = os.getenv('LOG_LEVEL', 'info').lower()
+        level = next((lvl for lvl, name in LEVEL_NAMES.items() if name == level_name), INFO)
+
+        # EVENT_LOG_SAMPLE=kb.fuzzy_match=0.1,tool.call=0.5
+        sample_rates = {"kb.fuzzy_match": 0.1}
+        for pair in filter(None, os.getenv('EVENT_LOG_SAMPLE', '').split(',')):
+            event, _, rate = pair.partition('=')
+            sample_rates[event.strip()] = float(rate)
+
+        log_path = os.getenv('EVENT_LOG_PATH')
+        stream = open(log_path, 'a', encoding='utf-8') if log_path else None
+        return cls(stream=stream, level=level, sample_rates=sample_rates)
+
+    def set_level(self, level: int):
+        self.level = level
+        for lvl, name in LEVEL_NAMES.items():
+            if lvl >= level:
+                setattr(self, name, self._make_emitter(lvl))
+            else:
+                setattr(self, name, _noop)
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def _make_emitter(self, level: int):
+        def emit(event: str, **fields):
+            self.log(level, event, **fields)
+        return emit
+
+    def log(self, level: int, event: str, **fields):
+        if level < self.level:
+            return
+
+        rate = self.sample_rates.get(event)
+        if rate is not None and self._random.random() >= rate:
+            return
+
+        record = {
+            "ts": time.time(),
+            "level": LEVEL_NAMES.get(level, str(level)),
+            "event": event,
+            **_event_context.get(),
+            **fields,
+        }
+        if rate is not None:
+            record["sample_rate"] = rate
+
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._dropped += 1
+
+    @contextmanager
+    def bind(self, **fields):
+        """Anexa campos a todos os eventos registrados dentro do bloco"""
+        token = _event_context.set({**_event_context.get(), **fields})
+        try:
+            yield
+        finally:
+            _event_context.reset(token)
+
+    @staticmethod
+    def context() -> Dict:
+        return dict(_event_context.get())
+
+    @contextmanager
+    def timed(self, event: str, level: int = INFO, **fields):
+        """Registra ``event`` ao final do bloco com a duração em ``duration_ms``"""
+        started = time.perf_counter()
+        try:
+            yield fields
+        except Exception as e:
+            fields["error"] = str(e)
+            raise
+        finally:
+            self.log(level, event, duration_ms=round((time.perf_counter() - started) * 1000, 3), **fields)
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            lines = [json.dumps(record, ensure_ascii=False, default=str) for record in batch if record is not None]
+            if self._dropped:
+                lines.append(json.dumps({"ts": time.time(), "level": "warning", "event": "log.dropped", "count": self._dropped}))
+                self._dropped = 0
+
+            try:
+                if lines:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+            except Exception:
+                pass
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            if stop:
+                return
+
+    def flush(self):
+        """Bloqueia até todos os eventos já registrados serem escritos"""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=self.flush_interval * 5)
+
+
+event_logger = EventLogger.from_env()
@@ -0,0 +1,325 @@
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+
+CAMPOS_OBRIGATORIOS = ("nome", "documento", "rua", "numero")
+CAMPOS_ENDERECO = ("rua", "numero", "complemento", "referencia")
+
+TIPOS_LOGRADOURO = r"(?:rua|r\.|avenida|av\.?|alameda|al\.|travessa|tv\.|estrada|rodovia|praça|praca|largo|viela|servidão)"
+
+_RE_LOGRADOURO = re.compile(rf"^{TIPOS_LOGRADOURO}\s+\S", re.IGNORECASE)
+# Logradouro no meio do trecho, como em "moro na Rua X"
+_RE_LOGRADOURO_INTERNO = re.compile(rf"\b(?:na|no|em|é)\s+(?={TIPOS_LOGRADOURO}\s+\S)", re.IGNORECASE)
+_RE_RUA_COM_NUMERO = re.compile(
+    r"^(?P<rua>.+?)(?:\s*,?\s*(?:n[º°o]\.?|nº|n°|número|numero)?\s*(?P<numero>\d+[a-zA-Z]?|s/n))$",
+    re.IGNORECASE,
+)
+_RE_NUMERO = re.compile(r"^(?:n[º°o]\.?|nº|n°|número|numero)?\s*(\d+[a-zA-Z]?|s/n)$", re.IGNORECASE)
+_RE_COMPLEMENTO = re.compile(
+    r"^(?:complemento:?\s*)?(?:apto|apartamento|ap\.?|bloco|bl\.?|casa|sala|fundos|conjunto|cj\.?|andar|lote|quadra)\b",
+    re.IGNORECASE,
+)
+_RE_REFERENCIA = re.compile(
+    r"(?:ponto de referência|ponto de referencia|referência|referencia|ref\.)\s*:?\s*(?:é\s+)?(?P<ref>.+)"
+    r"|(?P<perto>(?:perto|pert(?:inho)?|próximo|proximo|em frente|ao lado|atrás|atras|esquina)\s+(?:d[oae]s?|a[o]?|com(?:\s+[ao]s?)?)\s+.+)",
+    re.IGNORECASE,
+)
+_RE_NOME_EXPLICITO = re.compile(
+    r"(?:meu nome é|meu nome e|me chamo|nome:|nome é|sou (?:o|a))\s+(?P<nome>[A-Za-zÀ-ÿ' ]+?)(?=\s*(?:,|;|\.|\be\s+(?:o\s+)?(?:meu|cpf|rg)\b|\bcpf\b|\brg\b|\d|$))",
+    re.IGNORECASE,
+)
+_RE_NOME_SOLTO = re.compile(r"^[A-Za-zÀ-ÿ']+(?:\s+[A-Za-zÀ-ÿ']+){0,5}$")
+_PARTICULAS_NOME = {"da", "de", "do", "das", "dos", "e"}
+# Rótulo que acompanha o documento ("e meu CPF é", "RG:"), removido junto com ele
+_RE_ROTULO_DOCUMENTO = re.compile(
+    r"(?:\b(?:e\s+)?(?:o\s+|a\s+)?(?:meu\s+|minha\s+)?(?:cpf|rg|documento|identidade)\b\s*(?:é\s+|:\s*)?)",
+    re.IGNORECASE,
+)
+_RE_CPF = re.compile(r"(?<![\d.])(\d{3}\.?\d{3}\.?\d{3}-?\d{2})(?![\d])")
+_RE_RG = re.compile(r"(?<![\d.])(\d{1,2}\.?\d{3}\.?\d{3}-?[\dXx])(?![\dA-Za-z])")
+
+# Primeiras palavras que indicam que o trecho não é um nome
+_NAO_NOMES = {
+    "sim", "não", "nao", "ok", "oi", "olá", "ola", "pode", "confirma", "confirmo", "isso", "tudo",
+    "meu", "minha", "cpf", "rg", "documento", "endereço", "endereco", "quero", "obrigado", "obrigada",
+    "beleza", "certo", "correto", "finaliza", "finalizar", "boa", "bom",
+}
+# Palavras de pedido ou de mudança de assunto: um trecho sem marcador com alguma delas não é nome
+_PALAVRAS_PEDIDO = {
+    "pizza", "pizzas", "sabor", "sabores", "borda", "tamanho", "grande", "média", "media", "pequena",
+    "broto", "família", "familia", "quero", "queria", "trocar", "troca", "tirar", "esqueci", "espera",
+    "verdade", "cancelar", "cancela", "mudar", "mais", "também", "tambem", "pedido", "entrega",
+}
+# Trechos de cortesia que não pedem nada além dos dados enviados
+_RE_CORTESIA = re.compile(
+    r"^(?:(?:oi|olá|ola|bom dia|boa tarde|boa noite|ok|sim|certo|beleza|obrigad[oa]|valeu|por favor"
+    r"|segue[m]?|aqui|meus dados|pode finalizar|pode fechar|é isso|só isso|isso)\b[\s!.]*)+$",
+    re.IGNORECASE,
+)
+_RE_TELEFONE = re.compile(r"\b(?:telefone|celular|fone|whats(?:app|zap)?|zap|contato)\b", re.IGNORECASE)
+
+
+def validate_cpf(cpf: str) -> bool:
+    """Confere os dois dígitos verificadores de um CPF (só dígitos)"""
+    if len(cpf) != 11 or cpf == cpf[0] * 11:
+        return False
+    digits = [int(d) for d in cpf]
+    for size in (9, 10):
+        total = sum(d * (size + 1 - i) for i, d in enumerate(digits[:size]))
+        if (total * 10 % 11) % 10 != digits[size]:
+            return False
+    return True
+
+
+def _extract_document(text: str) -> Dict:
+    lowered = text.lower()
+    # Onze dígitos ao lado de "telefone" são o telefone, não um CPF com erro
+    if _RE_TELEFONE.search(text) and "cpf" not in lowered:
+        return {}
+    for match in _RE_CPF.finditer(text):
+        cpf = re.sub(r"\D", "", match.group(1))
+        if validate_cpf(cpf):
+            return {"documento": cpf, "tipo_documento": "cpf"}
+        if "rg" not in lowered:
+            return {"documento_invalido": cpf}
+
+    # RG não tem dígito verificador nacional: só o formato é conferido
+    match = _RE_RG.search(text)
+    if match:
+        rg = re.sub(r"[^\dXx]", "", match.group(1)).upper()
+        return {"documento": rg, "tipo_documento": "rg"}
+    return {}
+
+
+def _clean_name(nome: str) -> Optional[str]:
+    nome = " ".join(nome.split()).strip(" '")
+    if len(nome) < 2 or nome.split()[0].lower() in _NAO_NOMES:
+        return None
+    return " ".join(part if part.isupper() and len(part) > 1 else part[:1].upper() + part[1:] for part in nome.split())
+
+
+def _explicit_name(segments: List[str]) -> Tuple[Optional[str], Optional[int]]:
+    """Nome com marcador ("meu nome é", "me chamo"...) e o índice do trecho onde está"""
+    for index, segment in enumerate(segments):
+        match = _RE_NOME_EXPLICITO.search(segment)
+        if match:
+            return _clean_name(match.group("nome")), index
+    return None, None
+
+
+def _guessed_name(segments: List[str]) -> Optional[str]:
+    """Primeiro trecho só com letras, como em "Ana Souza, 123.456.789-09"; quem chama decide se aceita"""
+    if not segments:
+        return None
+    first = segments[0]
+    if not _RE_NOME_SOLTO.match(first) or _RE_LOGRADOURO.match(first) or _RE_COMPLEMENTO.match(first):
+        return None
+    words = first.split()
+    if any(word.lower() in _NAO_NOMES or word.lower() in _PALAVRAS_PEDIDO for word in words):
+        return None
+    if len(segments) == 1:
+        # Mensagem só com o nome: exige nome e sobrenome com iniciais maiúsculas
+        if len(words) < 2 or any(w[0].islower() for w in words if w.lower() not in _PARTICULAS_NOME):
+            return None
+    return _clean_name(first)
+
+
+def _extract_address(segments: List[str]) -> Tuple[Dict, Set[int]]:
+    """Endereço encontrado nos trechos e os índices dos trechos usados"""
+    endereco = {}
+    usados = set()
+    for index, segment in enumerate(segments):
+        interno = _RE_LOGRADOURO_INTERNO.search(segment)
+        if "rua" not in endereco and interno and not _RE_REFERENCIA.search(segment[:interno.start()]):
+            segment = segment[interno.end():]
+
+        if "rua" not in endereco and _RE_LOGRADOURO.match(segment):
+            usados.add(index)
+            match = _RE_RUA_COM_NUMERO.match(segment)
+            if match:
+                endereco["rua"] = match.group("rua").strip(" ,")
+                endereco["numero"] = _normalize_number(match.group("numero"))
+            else:
+                endereco["rua"] = segment
+                following = segments[index + 1] if index + 1 < len(segments) else ""
+                numero = _RE_NUMERO.match(following)
+                if numero:
+                    endereco["numero"] = _normalize_number(numero.group(1))
+                    usados.add(index + 1)
+            continue
+
+        if "complemento" not in endereco and _RE_COMPLEMENTO.match(segment):
+            endereco["complemento"] = re.sub(r"^complemento:?\s*", "", segment, flags=re.IGNORECASE)
+            usados.add(index)
+            continue
+
+        referencia = _RE_REFERENCIA.search(segment)
+        if "referencia" not in endereco and referencia:
+            endereco["referencia"] = (referencia.group("ref") or referencia.group("perto")).strip()
+            usados.add(index)
+    return endereco, usados
+
+
+def _without_document(segment: str, dados: Dict) -> str:
+    """Trecho sem o documento já extraído e sem o rótulo dele ("meu cpf 526... e moro na Rua A" -> "moro na Rua A")"""
+    pattern = _RE_RG if dados.get("tipo_documento") == "rg" else _RE_CPF
+    if not pattern.search(segment):
+        return segment
+    segment = _RE_ROTULO_DOCUMENTO.sub(" ", pattern.sub(" ", segment))
+    segment = re.sub(r"^(?:e\s+)+|(?:\s+e)+$", "", " ".join(segment.split()), flags=re.IGNORECASE)
+    return segment.strip(" .:")
+
+
+def _normalize_number(numero: str) -> str:
+    return numero.upper() if numero.lower() == "s/n" else numero
+
+
+def _segments(text: str) -> List[str]:
+    # Vírgulas, ponto e vírgula, quebras de linha e travessões separam os trechos
+    parts = re.split(r"[,;\n]|\s+-\s+", text)
+    return [part.strip(" .") for part in parts if part.strip(" .")]
+
+
+def extract_customer_data(text: str, coletado: Optional[Dict] = None) -> Dict:
+    """Extrai nome, documento e endereço de uma mensagem livre, numa passada só.
+
+    Devolve só os campos encontrados (``nome``, ``documento``,
+    ``tipo_documento``, ``rua``, ``numero``, ``complemento``, ``referencia``).
+    Um CPF com dígitos verificadores errados vem em ``documento_invalido``, e
+    os trechos que não são dados nem cortesia vêm em ``nao_usado``: a
+    mensagem pede outra coisa e deve ir para o modelo.
+
+    ``coletado`` são os dados já anotados na conversa. Um nome sem marcador
+    ("meu nome é"...) só é aceito ao lado de documento ou endereço na mesma
+    mensagem, ou se nada foi coletado ainda, e nunca troca um nome já anotado.
+    """
+    coletado = coletado or {}
+    segments = _segments(text)
+    dados = {}
+    usados = set()
+
+    # O documento sai antes e é tirado dos trechos, para os dígitos dele não
+    # virarem número da casa; o resto do trecho (nome, endereço) continua valendo
+    dados.update(_extract_document(text))
+    if dados:
+        segments = [_without_document(segment, dados) for segment in segments]
+        usados.update(index for index, segment in enumerate(segments) if not segment)
+
+    endereco, usados_endereco = _extract_address(segments)
+    dados.update(endereco)
+    usados.update(usados_endereco)
+
+    # Resposta só com o número ("45", "número 45, casa 2") quando a rua já foi anotada
+    if coletado.get("rua") and not coletado.get("numero") and "rua" not in dados:
+        for index, segment in enumerate(segments):
+            numero = _RE_NUMERO.match(segment)
+            if numero and index not in usados:
+                dados["numero"] = _normalize_number(numero.group(1))
+                usados.add(index)
+                break
+
+    nome, index = _explicit_name(segments)
+    palpite = (
+        nome is None and not coletado.get("nome") and 0 not in usados
+        and bool(dados or not any(coletado.values()))
+    )
+    if palpite:
+        nome, index = _guessed_name(segments), 0
+    elif nome is None and coletado.get("nome") and (_guessed_name(segments) or "").lower() == coletado["nome"].lower():
+        # O cliente repetiu o nome já anotado junto com outro dado
+        usados.add(0)
+
+    nao_usado = [
+        segment for i, segment in enumerate(segments)
+        if i not in usados and not (nome and i == index) and not _RE_CORTESIA.match(segment)
+    ]
+    # Sem documento nem endereço ao lado, um palpite num recado que pede outra coisa não é nome
+    if nome and palpite and not dados and nao_usado:
+        nome = None
+        nao_usado.insert(0, segments[index])
+    if nome:
+        dados["nome"] = nome
+    if nao_usado:
+        dados["nao_usado"] = nao_usado
+    return dados
+
+
+def customer_fields(dados: Dict) -> Dict:
+    """Só os campos do cliente de um resultado de ``extract_customer_data``"""
+    return {campo: valor for campo, valor in dados.items() if campo not in ("documento_invalido", "nao_usado")}
+
+
+def missing_fields(dados: Dict) -> List[str]:
+    return [campo for campo in CAMPOS_OBRIGATORIOS if not dados.get(campo)]
+
+
+def evaluate_corpus(path: str) -> Dict:
+    """Mede a extração num corpus JSONL de conversas de coleta de dados.
+
+    Cada linha traz ``messages`` (mensagens do cliente, em ordem) e
+    ``expected`` (campos esperados ao fim; ``null`` quando o campo não pode
+    ter sido extraído). Opcionalmente, ``local`` diz, mensagem a mensagem, se
+    ela deve ser respondida sem o modelo. Conta como turno economizado cada
+    mensagem respondida localmente: algo foi extraído, nada mais foi pedido e
+    ainda faltam dados, então a pergunta seguinte não precisa do modelo.
+    """
+    conversations = fields_total = fields_correct = complete = 0
+    messages_total = turns_saved = 0
+    errors = []
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            case = json.loads(line)
+            conversations += 1
+
+            dados = {}
+            local = []
+            for message in case["messages"]:
+                messages_total += 1
+                resultado = extract_customer_data(message, dados)
+                extraido = customer_fields(resultado)
+                dados.update(extraido)
+                if "documento_invalido" in resultado:
+                    dados["documento_invalido"] = resultado["documento_invalido"]
+                local.append(bool(extraido) and "nao_usado" not in resultado and bool(missing_fields(dados)))
+            turns_saved += sum(local)
+
+            expected = case["expected"]
+            wrong = {
+                campo: {"esperado": valor, "extraido": dados.get(campo)}
+                for campo, valor in expected.items()
+                if str(dados.get(campo) or "").lower() != str(valor or "").lower()
+            }
+            if "local" in case and case["local"] != local:
+                wrong["local"] = {"esperado": case["local"], "extraido": local}
+            fields_total += len(expected)
+            fields_correct += len(expected) - len(wrong.keys() - {"local"})
+            complete += not missing_fields(dados)
+            if wrong:
+                errors.append({"messages": case["messages"], "erros": wrong})
+
+    return {
+        "conversations": conversations,
+        "field_accuracy": fields_correct / fields_total if fields_total else 0.0,
+        "conversation_accuracy": (conversations - len(errors)) / conversations if conversations else 0.0,
+        "complete": complete,
+        "messages": messages_total,
+        "llm_turns_saved": turns_saved,
+        "errors": errors,
+    }
+
+
+if __name__ == "__main__":
+    corpus = sys.argv[1] if len(sys.argv) > 1 else str(Path(__file__).with_name("extraction_corpus.jsonl"))
+    report = evaluate_corpus(corpus)
+    print(f"Conversas: {report['conversations']} ({report['complete']} com dados completos)")
+    print(f"Acerto por campo: {report['field_accuracy']:.1%}")
+    print(f"Acerto por conversa: {report['conversation_accuracy']:.1%}")
+    print(f"Turnos de LLM economizados: {report['llm_turns_saved']} de {report['messages']} mensagens")
+    for error in report["errors"]:
+        print(f"  ✗ {error['messages']}: {error['erros']}")
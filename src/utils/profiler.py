@@ -0,0 +1,197 @@
+import json
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from .events import event_logger
+
+
+# Amostrador do turno atual, visível também em threads que copiam o contexto
+_active_sampler: ContextVar[Optional["StackSampler"]] = ContextVar("active_sampler", default=None)
+
+class StackSampler:
+    """Amostrador de pilhas de baixo custo para um conjunto de threads.
+
+    Uma thread auxiliar lê ``sys._current_frames()`` a cada ``interval``
+    segundos e conta as pilhas vistas, da raiz para a folha.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._threads: Set[int] = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def track(self, thread_id: int):
+        self._threads.add(thread_id)
+
+    @staticmethod
+    def _label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})".replace(";", ":")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in tuple(self._threads):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame))
+                    frame = frame.f_back
+                if stack:
+                    self.samples[tuple(reversed(stack))] += 1
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+
+class TurnProfiler:
+    """Perfil por amostragem de turnos do chat, ligado em tempo de execução.
+
+    Pode ser ativado para uma fração dos turnos ou para um único
+    ``session_id``: por variável de ambiente, por sinal (``SIGUSR2`` liga e
+    desliga todos os turnos) ou chamando ``configure`` (ex.: a partir de um
+    endpoint administrativo). Cada turno perfilado gera, com o trace id no
+    nome, um arquivo de pilhas colapsadas (``flamegraph.pl``) e um JSON do
+    speedscope.
+    """
+
+    def __init__(self, output_dir: str, rate: float = 0.0, session_id: Optional[str] = None,
+                 interval: float = 0.005):
+        self.output_dir = Path(output_dir)
+        self.rate = rate
+        self.session_id = session_id
+        self.interval = interval
+        self._random = random.Random()
+        self._rate_before_signal = None
+
+    @classmethod
+    def from_env(cls) -> "TurnProfiler":
+        return cls(
+            output_dir=os.getenv('PROFILE_OUTPUT_DIR', '/tmp/beauty_pizza_profiles'),
+            rate=float(os.getenv('PROFILE_TURNS_RATE', '0')),
+            session_id=os.getenv('PROFILE_SESSION_ID') or None,
+            interval=float(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000,
+        )
+
+    def configure(self, rate: Optional[float] = None, session_id: Optional[str] = None,
+                  clear_session: bool = False):
+        if rate is not None:
+            self.rate = max(0.0, min(1.0, rate))
+        if session_id is not None:
+            self.session_id = session_id
+        if clear_session:
+            self.session_id = None
+        event_logger.info("profile.configured", rate=self.rate, profiled_session=self.session_id)
+
+    def install_signal_handler(self, signum: int = getattr(signal, "SIGUSR2", None)):
+        """Liga/desliga o perfil de todos os turnos ao receber o sinal (só na thread principal)"""
+        if signum is None:
+            return
+
+        def toggle(_signum, _frame):
+            if self._rate_before_signal is None:
+                self._rate_before_signal = self.rate
+                self.configure(rate=1.0)
+            else:
+                self.configure(rate=self._rate_before_signal)
+                self._rate_before_signal = None
+
+        signal.signal(signum, toggle)
+
+    def should_profile(self, session_id: Optional[str]) -> bool:
+        if self.session_id is not None and session_id == self.session_id:
+            return True
+        return self.rate > 0 and self._random.random() < self.rate
+
+    @staticmethod
+    def track_current_thread():
+        """Inclui a thread atual no perfil do turno em andamento, se houver um"""
+        sampler = _active_sampler.get()
+        if sampler is not None:
+            sampler.track(threading.get_ident())
+
+    @contextmanager
+    def profile(self, trace_id: str, session_id: Optional[str] = None):
+        """Amostra a thread atual durante o bloco, se o turno foi sorteado"""
+        if not self.should_profile(session_id):
+            yield None
+            return
+
+        sampler = StackSampler(self.interval)
+        sampler.track(threading.get_ident())
+        token = _active_sampler.set(sampler)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            yield sampler
+        finally:
+            samples = sampler.stop()
+            _active_sampler.reset(token)
+            self._write(trace_id, samples, time.perf_counter() - started)
+
+    def _write(self, trace_id: str, samples: Counter, seconds: float):
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            collapsed_path = self.output_dir / f"{trace_id}.collapsed"
+            speedscope_path = self.output_dir / f"{trace_id}.speedscope.json"
+
+            collapsed_path.write_text(
+                "".join(f"{';'.join(stack)} {count}\n" for stack, count in samples.most_common()),
+                encoding="utf-8",
+            )
+            speedscope_path.write_text(json.dumps(self._speedscope(trace_id, samples)), encoding="utf-8")
+
+            event_logger.info(
+                "profile.written",
+                trace_id=trace_id,
+                samples=sum(samples.values()),
+                duration_ms=round(seconds * 1000, 3),
+                collapsed=str(collapsed_path),
+                speedscope=str(speedscope_path),
+            )
+        except OSError as e:
+            event_logger.error("profile.write_failed", trace_id=trace_id, error=str(e))
+
+    def _speedscope(self, trace_id: str, samples: Counter) -> Dict:
+        frame_index: Dict[str, int] = {}
+        stacks = []
+        weights = []
+        for stack, count in samples.items():
+            stacks.append([frame_index.setdefault(label, len(frame_index)) for label in stack])
+            weights.append(count * self.interval)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": label} for label in frame_index]},
+            "profiles": [{
+                "type": "sampled",
+                "name": trace_id,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": stacks,
+                "weights": weights,
+            }],
+            "name": trace_id,
+            "exporter": "beauty-pizza-chatbot",
+        }
+
+
+turn_profiler = TurnProfiler.from_env()
@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+# Cardápio pequeno para os testes que importam o agente (tools abre a base ao importar)
+MENU_SQL = """
+CREATE TABLE pizzas (id INTEGER PRIMARY KEY, sabor TEXT, descricao TEXT, ingredientes TEXT);
+CREATE TABLE tamanhos (id INTEGER PRIMARY KEY, tamanho TEXT);
+CREATE TABLE bordas (id INTEGER PRIMARY KEY, tipo TEXT);
+CREATE TABLE precos (id INTEGER PRIMARY KEY, pizza_id INTEGER, tamanho_id INTEGER, borda_id INTEGER, preco REAL);
+INSERT INTO pizzas VALUES (1, 'Calabresa', 'Clássica', 'calabresa, cebola'), (2, 'Margherita', 'Italiana', 'tomate, mussarela, manjericão');
+INSERT INTO tamanhos VALUES (1, 'Pequena'), (2, 'Grande');
+INSERT INTO bordas VALUES (1, 'Tradicional'), (2, 'Recheada com Catupiry');
+INSERT INTO precos (pizza_id, tamanho_id, borda_id, preco)
+    SELECT p.id, t.id, b.id, 20 + p.id * 5 + t.id * 10 + (b.id - 1) * 6 FROM pizzas p, tamanhos t, bordas b;
+"""
+
+if not os.getenv('SQLITE_DB_PATH'):
+    menu_path = Path(tempfile.mkdtemp(prefix="beauty_pizza_tests_")) / "menu.sql"
+    menu_path.write_text(MENU_SQL, encoding="utf-8")
+    os.environ['SQLITE_DB_PATH'] = str(menu_path)
+os.environ.setdefault('MENU_WATCH_INTERVAL', '0')
@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import pytest
+
+from utils.extraction import customer_fields, evaluate_corpus, extract_customer_data
+
+CORPUS = Path(__file__).parent.parent / "src" / "utils" / "extraction_corpus.jsonl"
+
+
+def test_corpus_has_no_errors():
+    report = evaluate_corpus(str(CORPUS))
+
+    assert report["errors"] == []
+
+
+@pytest.mark.parametrize("message", [
+    "Na verdade, quero trocar a pizza",
+    "Espera, esqueci uma pizza",
+    "Calabresa grande, borda catupiry",
+    "Calabresa Grande",
+])
+def test_requests_are_not_read_as_names(message):
+    resultado = extract_customer_data(message)
+
+    assert customer_fields(resultado) == {}
+    assert resultado["nao_usado"]
+
+
+def test_phone_number_is_not_an_invalid_cpf():
+    resultado = extract_customer_data("meu telefone é 11987654321", {"nome": "Ana Souza"})
+
+    assert "documento_invalido" not in resultado
+    assert resultado["nao_usado"] == ["meu telefone é 11987654321"]
+
+
+def test_guess_never_replaces_a_collected_name():
+    coletado = {"nome": "Ana Souza"}
+
+    assert "nome" not in extract_customer_data("Bruno Lima, 52601815906", coletado)
+    assert extract_customer_data("meu nome é Bruno Lima", coletado)["nome"] == "Bruno Lima"
+
+
+def test_name_next_to_a_document_is_kept_with_the_rest_of_the_message():
+    resultado = extract_customer_data("Ana Souza, 52601815906, quero trocar a borda")
+
+    assert resultado["nome"] == "Ana Souza"
+    assert resultado["documento"] == "52601815906"
+    assert resultado["nao_usado"] == ["quero trocar a borda"]
+
+
+@pytest.mark.parametrize("message, numero, complemento", [
+    ("45", "45", None),
+    ("número 45", "45", None),
+    ("45, casa 2", "45", "casa 2"),
+])
+def test_bare_number_completes_a_collected_street(message, numero, complemento):
+    resultado = extract_customer_data(message, {"nome": "Ana Souza", "rua": "Rua das Flores"})
+
+    assert resultado.get("numero") == numero
+    assert resultado.get("complemento") == complemento
+    assert "nao_usado" not in resultado
+
+
+def test_bare_number_without_a_street_is_left_to_the_model():
+    assert extract_customer_data("45", {"nome": "Ana Souza"}) == {"nao_usado": ["45"]}
+
+
+def test_document_is_cut_out_of_its_segment():
+    resultado = extract_customer_data("meu cpf 52601815906 e moro na rua A, 10")
+    assert customer_fields(resultado) == {"documento": "52601815906", "tipo_documento": "cpf", "rua": "rua A", "numero": "10"}
+
+    resultado = extract_customer_data("Maria da Silva 52601815906")
+    assert resultado["nome"].lower() == "maria da silva"
+    assert resultado["documento"] == "52601815906"
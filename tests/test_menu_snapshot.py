@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+
+from integrations.knowledge_base import KnowledgeBase
+from integrations.menu_snapshot import MenuSnapshot, diff_menu_rows, read_menu_rows, summarize_diff
+
+
+MENU_SQL = """
+CREATE TABLE pizzas (id INTEGER PRIMARY KEY, sabor TEXT, descricao TEXT, ingredientes TEXT);
+CREATE TABLE tamanhos (id INTEGER PRIMARY KEY, tamanho TEXT);
+CREATE TABLE bordas (id INTEGER PRIMARY KEY, tipo TEXT);
+CREATE TABLE precos (id INTEGER PRIMARY KEY, pizza_id INTEGER, tamanho_id INTEGER, borda_id INTEGER, preco REAL);
+INSERT INTO pizzas VALUES (1, 'Margherita', 'Italiana', 'tomate, mussarela'), (2, 'Calabresa', 'Clássica', 'calabresa, cebola');
+INSERT INTO tamanhos VALUES (2, 'Grande'), (1, 'Pequena');
+INSERT INTO bordas VALUES (1, 'Tradicional');
+INSERT INTO precos (pizza_id, tamanho_id, borda_id, preco) VALUES (1, 1, 1, 30.0), (1, 2, 1, 45.0), (2, 1, 1, 32.0), (2, 2, 1, 48.0);
+"""
+
+
+@pytest.fixture
+def rows():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(MENU_SQL)
+    try:
+        return read_menu_rows(conn)
+    finally:
+        conn.close()
+
+
+def _copy(rows):
+    return {table: dict(entries) for table, entries in rows.items()}
+
+
+def test_rows_are_keyed_by_id_and_prices_by_combination(rows):
+    assert rows["pizzas"][2]["sabor"] == "Calabresa"
+    assert rows["tamanhos"][1] == {"id": 1, "tamanho": "Pequena"}
+    assert rows["precos"][(1, 2, 1)] == 45.0
+
+
+def test_diff_reports_added_changed_and_removed_rows(rows):
+    new = _copy(rows)
+    new["precos"][(1, 2, 1)] = 47.0
+    new["precos"][(3, 1, 1)] = 35.0
+    new["pizzas"][3] = {"id": 3, "sabor": "Portuguesa", "descricao": "Completa", "ingredientes": "ovo"}
+    del new["bordas"][1]
+
+    diff = diff_menu_rows(rows, new)
+
+    assert set(diff) == {"pizzas", "bordas", "precos"}
+    assert diff["precos"] == {"added": {(3, 1, 1): 35.0}, "changed": {(1, 2, 1): 47.0}, "removed": []}
+    assert diff["pizzas"]["added"][3]["sabor"] == "Portuguesa"
+    assert diff["bordas"] == {"added": {}, "changed": {}, "removed": [1]}
+    assert summarize_diff(diff)["precos"] == {"added": 1, "changed": 1, "removed": 0}
+
+
+def test_same_rows_give_an_empty_diff(rows):
+    assert diff_menu_rows(rows, _copy(rows)) == {}
+
+
+def test_apply_builds_a_new_version_and_keeps_the_old_one(rows):
+    snapshot = MenuSnapshot(rows)
+    new = _copy(rows)
+    new["precos"][(2, 2, 1)] = 50.0
+    new["pizzas"][1] = {**rows["pizzas"][1], "sabor": "Marguerita"}
+    del new["tamanhos"][1]
+
+    updated = snapshot.apply(diff_menu_rows(rows, new))
+
+    assert updated.version == snapshot.version + 1
+    assert updated.rows == new
+    assert updated.price(2, 2, 1) == 50.0
+    assert updated.pizza_by_flavor("marguerita")["id"] == 1
+    assert updated.pizza_by_flavor("Margherita") is None
+    assert [size["tamanho"] for size in updated.sizes()] == ["Grande"]
+
+    assert snapshot.price(2, 2, 1) == 48.0
+    assert [size["tamanho"] for size in snapshot.sizes()] == ["Pequena", "Grande"]
+
+
+def test_lookups_are_sorted_and_return_copies(rows):
+    snapshot = MenuSnapshot(rows)
+
+    assert [pizza["sabor"] for pizza in snapshot.all_pizzas()] == ["Calabresa", "Margherita"]
+    snapshot.all_pizzas()[0]["sabor"] = "Alterada"
+    assert snapshot.pizza_by_flavor("CALABRESA")["sabor"] == "Calabresa"
+    assert sorted(snapshot.price_grid()) == sorted((*key, price) for key, price in rows["precos"].items())
+
+
+def test_knowledge_base_applies_diff_and_notifies_subscribers(tmp_path):
+    script = tmp_path / "menu.sql"
+    script.write_text(MENU_SQL, encoding="utf-8")
+    knowledge_base = KnowledgeBase(str(script))
+    before = knowledge_base.load_snapshot()
+    received = []
+    knowledge_base.subscribe(received.append)
+
+    diff = {"precos": {"added": {}, "changed": {(1, 1, 1): 33.0}, "removed": []}}
+    knowledge_base.apply_menu_diff(diff)
+
+    assert received == [diff]
+    assert knowledge_base.get_price(1, 1, 1) == 33.0
+    assert knowledge_base.get_menu_version() == ("snapshot", before.version + 1)
+    assert before.price(1, 1, 1) == 30.0
@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip("agno.agent")
+
+from agent import BeautyPizzaAgent, model_router  # noqa: E402
+
+
+def _tool_names(agent):
+    return [function.name for function in agent.tools]
+
+
+def test_profile_switch_exposes_the_new_state_tools():
+    bella = BeautyPizzaAgent("sk-test", turn_timeout=0)
+    inicial = model_router.profile_for(bella.ESTADO_INICIAL)
+    assert _tool_names(bella.agent) == list(inicial.tools)
+
+    criando = model_router.profile_for(bella.ESTADO_CRIANDO_PEDIDO)
+    bella._apply_model_profile(criando)
+
+    assert _tool_names(bella.agent) == list(criando.tools)
+    assert "create_order" in _tool_names(bella.agent)
+    # O agno só prepara de novo as ferramentas para o modelo com _rebuild_tools ligado
+    assert getattr(bella.agent, "_rebuild_tools", True) is True
@@ -0,0 +1,242 @@
+import pytest
+
+from integrations.order_api import OrderAPI
+from integrations.order_outbox import PROVISIONAL_ID_BASE, OrderOutbox
+
+
+class FakeOrderAPI:
+    """Order API em memória que registra as chamadas e falha quando mandado"""
+
+    def __init__(self):
+        self.calls = []
+        self.fail = {}
+        self._next_id = 100
+
+    build_item = OrderAPI.build_item
+
+    def _maybe_fail(self, op):
+        if self.fail.get(op):
+            self.fail[op] -= 1
+            raise RuntimeError(f"{op} indisponível")
+
+    def create_order(self, client_name, client_document, delivery_date, delivery_address=None):
+        self._maybe_fail("create_order")
+        self._next_id += 1
+        self.calls.append(("create_order", self._next_id, client_name))
+        return {"id": self._next_id}
+
+    def add_items_to_order(self, order_id, items):
+        self._maybe_fail("add_items")
+        self.calls.append(("add_items", order_id, [item["name"] for item in items]))
+        return {"id": order_id}
+
+    def update_delivery_address(self, order_id, street_name, number, complement=None, reference_point=None):
+        self._maybe_fail("update_address")
+        self.calls.append(("update_address", order_id, street_name))
+        return {"id": order_id}
+
+
+@pytest.fixture
+def api():
+    return FakeOrderAPI()
+
+
+@pytest.fixture
+def make_outbox(tmp_path, api):
+    outboxes = []
+
+    def make(max_attempts=1, backoff=0.0):
+        outbox = OrderOutbox(api, str(tmp_path / "outbox.db"), max_attempts=max_attempts, backoff=backoff, autostart=False)
+        outboxes.append(outbox)
+        return outbox
+
+    yield make
+    for outbox in outboxes:
+        outbox.close()
+
+
+def _create(outbox):
+    return outbox.create_order("Ana Souza", "52601815906", "2030-01-01")["id"]
+
+
+def test_create_returns_provisional_id_until_delivered(make_outbox):
+    outbox = make_outbox()
+    order_id = _create(outbox)
+
+    assert order_id > PROVISIONAL_ID_BASE
+    assert outbox.is_provisional(order_id)
+    assert outbox.resolve(order_id) is None
+
+    outbox.flush()
+
+    assert outbox.resolve(order_id) == 101
+    assert outbox.wait_for(order_id) == 101
+    assert outbox.resolve(55) == 55
+
+
+def test_consecutive_items_are_coalesced_into_one_call(make_outbox, api):
+    outbox = make_outbox()
+    order_id = _create(outbox)
+    for flavor in ("Calabresa", "Margherita", "Portuguesa"):
+        outbox.add_item_to_order(order_id, flavor, "Grande", "Tradicional", 1, 40.0)
+    outbox.update_delivery_address(order_id, "Rua das Flores", "123")
+
+    outbox.flush()
+
+    assert api.calls == [
+        ("create_order", 101, "Ana Souza"),
+        ("add_items", 101, ["Pizza Calabresa Grande", "Pizza Margherita Grande", "Pizza Portuguesa Grande"]),
+        ("update_address", 101, "Rua das Flores"),
+    ]
+    assert outbox.stats() == {"delivered": 5}
+
+
+def test_operations_keep_their_order(make_outbox, api):
+    outbox = make_outbox()
+    order_id = _create(outbox)
+    outbox.add_item_to_order(order_id, "Calabresa", "Grande", "Tradicional")
+    outbox.update_delivery_address(order_id, "Rua das Flores", "123")
+    outbox.add_item_to_order(order_id, "Margherita", "Média", "Catupiry")
+
+    outbox.flush()
+
+    assert [call[0] for call in api.calls] == ["create_order", "add_items", "update_address", "add_items"]
+    assert api.calls[-1][2] == ["Pizza Margherita Média - Borda Catupiry"]
+
+
+def test_failed_attempt_is_retried(make_outbox, api):
+    outbox = make_outbox(max_attempts=3)
+    order_id = _create(outbox)
+    outbox.add_item_to_order(order_id, "Calabresa", "Grande", "Tradicional")
+    api.fail["add_items"] = 1
+
+    outbox.flush()
+    assert outbox.stats() == {"delivered": 1, "pending": 1}
+
+    outbox.flush()
+    assert outbox.stats() == {"delivered": 2}
+    assert outbox.wait_for(order_id) == 101
+
+
+def test_failed_create_fails_the_rest_of_the_order(make_outbox, api):
+    outbox = make_outbox()
+    api.fail["create_order"] = 1
+    order_id = _create(outbox)
+    outbox.add_item_to_order(order_id, "Calabresa", "Grande", "Tradicional")
+
+    outbox.flush()
+
+    assert outbox.resolve(order_id) is None
+    assert [failure["op"] for failure in outbox.failed_ops(order_id)] == ["create_order", "add_items"]
+    assert "create_order indisponível" in outbox.failed_ops(order_id)[0]["error"]
+    assert outbox.stats() == {"failed": 2}
+    with pytest.raises(RuntimeError, match="Falha ao enviar"):
+        outbox.wait_for(order_id)
+
+
+def test_dead_letter_survives_later_deliveries(make_outbox, api):
+    outbox = make_outbox()
+    order_id = _create(outbox)
+    outbox.flush()
+
+    api.fail["add_items"] = 1
+    outbox.add_item_to_order(order_id, "Calabresa", "Grande", "Tradicional")
+    outbox.flush()
+    outbox.update_delivery_address(order_id, "Rua das Flores", "123")
+    outbox.flush()
+
+    # Leituras do pedido seguem funcionando; a pizza perdida continua registrada
+    assert outbox.wait_for(order_id) == 101
+    failures = outbox.failed_ops(101)
+    assert [failure["op"] for failure in failures] == ["add_items"]
+    assert failures[0]["payload"]["items"][0]["name"] == "Pizza Calabresa Grande"
+
+
+def test_failures_are_taken_once(make_outbox, api):
+    outbox = make_outbox()
+    order_id = _create(outbox)
+    api.fail["add_items"] = 1
+    outbox.add_item_to_order(order_id, "Calabresa", "Grande", "Tradicional")
+    outbox.flush()
+
+    assert [failure["op"] for failure in outbox.take_failures(101)] == ["add_items"]
+    assert outbox.take_failures(order_id) == []
+    assert len(outbox.failed_ops(order_id)) == 1
+
+
+def test_retries_wait_with_exponential_backoff(make_outbox, api, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("integrations.order_outbox.time.time", lambda: now[0])
+    outbox = make_outbox(max_attempts=3, backoff=2.0)
+    order_id = _create(outbox)
+    api.fail["create_order"] = 2
+
+    outbox.flush()
+    outbox.flush()
+    assert outbox.stats() == {"pending": 1}
+
+    now[0] += 2.0
+    outbox.flush()
+    assert outbox.stats() == {"pending": 1}
+
+    now[0] += 3.0
+    assert outbox.resolve(order_id) is None
+    outbox.flush()
+    assert outbox.stats() == {"pending": 1}
+
+    now[0] += 1.0
+    outbox.flush()
+    assert outbox.resolve(order_id) == 101
+
+
+def test_limits_come_from_env(monkeypatch, tmp_path, api):
+    monkeypatch.setenv("ORDER_OUTBOX_PATH", str(tmp_path / "outbox.db"))
+    monkeypatch.setenv("ORDER_OUTBOX_MAX_ATTEMPTS", "12")
+    monkeypatch.setenv("ORDER_OUTBOX_BACKOFF", "0.5")
+
+    outbox = OrderOutbox.from_env(api)
+    try:
+        assert (outbox.max_attempts, outbox.backoff) == (12, 0.5)
+    finally:
+        outbox.close()
+
+    monkeypatch.delenv("ORDER_OUTBOX_PATH")
+    assert OrderOutbox.from_env(api) is None
+
+
+def test_state_survives_restart(make_outbox, api):
+    outbox = make_outbox()
+    order_id = _create(outbox)
+    outbox.add_item_to_order(order_id, "Calabresa", "Grande", "Tradicional")
+    outbox.close()
+
+    reopened = make_outbox()
+    reopened.flush()
+
+    assert reopened.resolve(order_id) == 101
+    assert [call[0] for call in api.calls] == ["create_order", "add_items"]
+
+
+def test_conversation_is_told_about_lost_items(make_outbox, api, monkeypatch):
+    pytest.importorskip("agno.agent")
+    from agent import BeautyPizzaAgent
+    from agent import beauty_pizza_agent
+
+    outbox = make_outbox()
+    monkeypatch.setattr(beauty_pizza_agent, "order_outbox", outbox)
+    order_id = _create(outbox)
+    outbox.flush()
+    api.fail["add_items"] = 1
+    outbox.add_item_to_order(order_id, "Calabresa", "Grande", "Tradicional")
+    outbox.update_delivery_address(order_id, "Rua das Flores", "123")
+    outbox.flush()
+
+    bella = BeautyPizzaAgent("sk-test", turn_timeout=0)
+    bella.conversation_state.update(order_id=order_id, estado=bella.ESTADO_FINALIZADO)
+
+    aviso = bella._reconcile_order_id()
+
+    assert bella.conversation_state["order_id"] == 101
+    assert "Pizza Calabresa Grande" in aviso and "o endereço de entrega" in aviso
+    assert bella.conversation_state["estado"] == bella.ESTADO_CRIANDO_PEDIDO
+    assert bella._reconcile_order_id() is None
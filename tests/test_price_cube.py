@@ -0,0 +1,86 @@
+import pytest
+
+from integrations.knowledge_base import KnowledgeBase
+from integrations.price_cube import PriceCube
+
+
+PIZZAS = [{'id': 7, 'sabor': 'Calabresa'}, {'id': 3, 'sabor': 'Margherita'}]
+SIZES = [{'id': 10, 'tamanho': 'Pequena'}, {'id': 20, 'tamanho': 'Média'}, {'id': 30, 'tamanho': 'Grande'}]
+CRUSTS = [{'id': 1, 'tipo': 'Tradicional'}, {'id': 2, 'tipo': 'Recheada com Catupiry'}]
+
+
+@pytest.fixture
+def cube():
+    # Ids fora de ordem e sem sequência, e Margherita Grande com Catupiry sem preço
+    prices = [
+        (pizza['id'], size['id'], crust['id'], pizza['id'] + size['id'] + crust['id'] / 10)
+        for pizza in PIZZAS for size in SIZES for crust in CRUSTS
+        if (pizza['id'], size['id'], crust['id']) != (3, 30, 2)
+    ]
+    return PriceCube(PIZZAS, SIZES, CRUSTS, prices + [(99, 10, 1, 50.0)])
+
+
+def test_every_combination_lands_in_its_own_cell(cube):
+    for pizza in PIZZAS:
+        for size in SIZES:
+            for crust in CRUSTS:
+                if (pizza['id'], size['id'], crust['id']) == (3, 30, 2):
+                    continue
+                assert cube.price(pizza['id'], size['id'], crust['id']) == pytest.approx(
+                    pizza['id'] + size['id'] + crust['id'] / 10
+                )
+
+    offsets = {cube._offset(p['id'], s['id'], c['id']) for p in PIZZAS for s in SIZES for c in CRUSTS}
+    assert offsets == set(range(len(PIZZAS) * len(SIZES) * len(CRUSTS)))
+
+
+def test_missing_price_or_unknown_id_is_none(cube):
+    assert cube.price(3, 30, 2) is None
+    assert cube.price(99, 10, 1) is None
+    assert cube.price(7, 40, 1) is None
+
+
+def test_prices_for_pizza_skip_combinations_without_price(cube):
+    combinations = cube.prices_for_pizza(3)
+
+    assert len(combinations) == len(SIZES) * len(CRUSTS) - 1
+    assert combinations[0] == (SIZES[0], CRUSTS[0], pytest.approx(13.1))
+    assert (SIZES[2], CRUSTS[1]) not in [(size, crust) for size, crust, _ in combinations]
+    assert cube.prices_for_pizza(99) == []
+
+
+def test_quote_multiplies_quantities_and_skips_unpriced_lines(cube):
+    unit_prices, total = cube.quote([(7, 10, 1, 2), (3, 30, 2, 1), (3, 20, 2, 3), (5, 10, 1, 1)])
+
+    assert unit_prices == [pytest.approx(17.1), None, pytest.approx(23.2), None]
+    assert total == round(17.1 * 2 + 23.2 * 3, 2)
+    assert cube.quote([]) == ([], 0.0)
+
+
+def test_quote_cart_resolves_names_and_reports_what_it_cannot_price(tmp_path):
+    script = tmp_path / "menu.sql"
+    script.write_text("""
+CREATE TABLE pizzas (id INTEGER PRIMARY KEY, sabor TEXT, descricao TEXT, ingredientes TEXT);
+CREATE TABLE tamanhos (id INTEGER PRIMARY KEY, tamanho TEXT);
+CREATE TABLE bordas (id INTEGER PRIMARY KEY, tipo TEXT);
+CREATE TABLE precos (id INTEGER PRIMARY KEY, pizza_id INTEGER, tamanho_id INTEGER, borda_id INTEGER, preco REAL);
+INSERT INTO pizzas VALUES (1, 'Calabresa', '', ''), (2, 'Margherita', '', '');
+INSERT INTO tamanhos VALUES (1, 'Pequena'), (2, 'Grande');
+INSERT INTO bordas VALUES (1, 'Tradicional'), (2, 'Recheada com Catupiry');
+INSERT INTO precos (pizza_id, tamanho_id, borda_id, preco) VALUES (1, 2, 1, 40.0), (1, 2, 2, 46.5), (2, 1, 1, 30.0);
+""", encoding="utf-8")
+    knowledge_base = KnowledgeBase(str(script))
+
+    quote = knowledge_base.quote_cart([
+        {'sabor': 'calabresa', 'tamanho': 'grande', 'quantidade': 2},
+        {'sabor': 'Calabreza', 'tamanho': 'Grande', 'borda': 'recheada catupiry'},
+        {'sabor': 'Margherita', 'tamanho': 'Grande'},
+        {'sabor': 'Frango', 'tamanho': 'Pequena'},
+    ])
+
+    assert [(item['sabor'], item['borda'], item['subtotal']) for item in quote['itens']] == [
+        ('Calabresa', 'Tradicional', 80.0),
+        ('Calabresa', 'Recheada com Catupiry', 46.5),
+    ]
+    assert quote['total'] == 126.5
+    assert [item['sabor'] for item in quote['nao_encontrados']] == ['Frango', 'Margherita']
@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("agno.tools")
+
+from agent.scheduler import ModelCallScheduler, SchedulerSaturated, TokenBucket  # noqa: E402
+from utils.deadline import DeadlineExceeded  # noqa: E402
+
+
+def _scheduler(**limits):
+    defaults = {"requests_per_minute": 100_000, "tokens_per_minute": 10_000_000, "max_concurrency": 1, "max_queue_wait": 5.0}
+    return ModelCallScheduler(**{**defaults, **limits})
+
+
+def _grant_order(scheduler, requests):
+    """Enfileira ``(sessão, prioridade)`` nessa ordem atrás de uma chamada em andamento e devolve a ordem de admissão"""
+    running = scheduler.acquire("em-andamento", 1)
+    order = []
+
+    def call(session_id, priority):
+        ticket = scheduler.acquire(session_id, 1, priority)
+        order.append(session_id)
+        scheduler.release(ticket)
+
+    threads = []
+    for depth, (session_id, priority) in enumerate(requests, start=1):
+        thread = threading.Thread(target=call, args=(session_id, priority))
+        thread.start()
+        threads.append(thread)
+        while scheduler._depth < depth:
+            time.sleep(0.001)
+
+    scheduler.release(running)
+    for thread in threads:
+        thread.join(timeout=5)
+    return order
+
+
+def test_bucket_refills_at_its_per_minute_rate():
+    bucket = TokenBucket(60)
+    bucket.updated_at = 0.0
+
+    assert bucket.time_until(10, now=0.0) == 0.0
+    bucket.take(60)
+    assert bucket.time_until(10, now=0.0) == pytest.approx(10.0)
+    assert bucket.time_until(10, now=5.0) == pytest.approx(5.0)
+    # Pedidos maiores que a capacidade esperam só o balde encher
+    assert bucket.time_until(1000, now=5.0) == pytest.approx(55.0)
+
+
+def test_bucket_adjust_charges_and_refunds_up_to_capacity():
+    bucket = TokenBucket(60)
+    bucket.updated_at = 0.0
+
+    bucket.adjust(80)
+    assert bucket.time_until(0, now=0.0) == pytest.approx(20.0)
+    bucket.adjust(-500)
+    assert bucket.tokens == 60
+
+
+def test_quiet_session_is_served_before_a_chatty_one():
+    order = _grant_order(_scheduler(), [("falante", 0), ("falante", 0), ("falante", 0), ("quieta", 0)])
+
+    assert order == ["falante", "quieta", "falante", "falante"]
+
+
+def test_higher_priority_goes_first():
+    order = _grant_order(_scheduler(), [("normal", 0), ("urgente", 1)])
+
+    assert order == ["urgente", "normal"]
+
+
+def test_rejects_when_the_queue_is_full():
+    scheduler = _scheduler(max_concurrency=16)
+    scheduler.max_queue_depth = 0
+
+    with pytest.raises(SchedulerSaturated):
+        scheduler.acquire("ana", 10)
+    assert scheduler.stats()["rejected"] == 1
+
+
+def test_rejects_up_front_when_the_request_budget_is_spent():
+    scheduler = _scheduler(requests_per_minute=1, max_concurrency=16)
+    scheduler.release(scheduler.acquire("ana", 10))
+
+    with pytest.raises(SchedulerSaturated):
+        scheduler.acquire("ana", 10)
+    # Com o prazo do turno menor que a espera máxima, a culpa é do prazo
+    with pytest.raises(DeadlineExceeded):
+        scheduler.acquire("ana", 10, timeout=1.0)
+    assert scheduler.stats()["rejected"] == 2
+
+
+def test_turn_deadline_gives_up_in_the_queue_and_leaves_it_clean():
+    scheduler = _scheduler()
+    running = scheduler.acquire("bruno", 10)
+
+    with pytest.raises(DeadlineExceeded):
+        scheduler.acquire("ana", 10, timeout=0.05)
+    scheduler.release(running)
+
+    assert scheduler._depth == 0 and not scheduler._queues
+    assert scheduler.stats()["timed_out"] == 1
+    scheduler.release(scheduler.acquire("ana", 10, timeout=0.05))
+
+
+def test_record_usage_charges_the_real_token_count():
+    scheduler = _scheduler(tokens_per_minute=60_000, max_concurrency=16)
+    ticket = scheduler.acquire("ana", 1_000)
+
+    scheduler.record_usage(ticket, total_tokens=61_000, requests=3)
+    scheduler.release(ticket)
+
+    # Saldo negativo: a próxima chamada só entra quando os tokens extras forem repostos
+    assert scheduler.tokens_bucket.time_until(0, time.monotonic()) == pytest.approx(1.0, abs=0.1)
+    assert scheduler.requests_bucket.tokens == pytest.approx(100_000 - 3, abs=1)
+    assert scheduler.stats()["admitted"] == 1
@@ -0,0 +1,126 @@
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("agno.tools")
+
+from agent import TOOLS_REGISTRY, tool_cache, tool_register  # noqa: E402
+from agent.tool_cache import ToolResultCache, normalize_argument, tool_session  # noqa: E402
+
+
+@pytest.fixture
+def order_tools():
+    """Uma leitura memorizada e uma escrita no mesmo pedido, contando as chamadas reais"""
+    calls = []
+
+    @tool_register(name="test_get_order", cache_ttl=60, cache_tag="order_id")
+    def get_order(order_id: int, detalhado: bool = False):
+        calls.append(("get_order", order_id))
+        return {"id": order_id, "chamada": len(calls)}
+
+    @tool_register(name="test_add_item", invalidates="order_id")
+    def add_item(order_id: int, sabor: str):
+        calls.append(("add_item", order_id))
+        return {"id": order_id}
+
+    tool_cache.clear()
+    yield TOOLS_REGISTRY["test_get_order"].entrypoint, TOOLS_REGISTRY["test_add_item"].entrypoint, calls
+    tool_cache.clear()
+    del TOOLS_REGISTRY["test_get_order"], TOOLS_REGISTRY["test_add_item"]
+
+
+def test_normalize_argument_ignores_case_spaces_and_type():
+    assert normalize_argument(" Calabresa ") == normalize_argument("calabresa")
+    assert normalize_argument(12) == normalize_argument("12")
+    assert normalize_argument({"b": 1, "a": "X"}) == normalize_argument({"a": "x", "b": 1})
+
+
+def test_read_is_memoized_per_session(order_tools):
+    get_order, _, calls = order_tools
+
+    with tool_session("ana"):
+        first = get_order(42)
+        assert get_order("42 ") == first
+    with tool_session("bruno"):
+        get_order(42)
+
+    assert calls == [("get_order", 42), ("get_order", 42)]
+    stats = tool_cache.stats()["tools"]["test_get_order"]
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+
+def test_write_invalidates_reads_of_the_same_order_in_every_session(order_tools):
+    get_order, add_item, calls = order_tools
+
+    with tool_session("ana"):
+        get_order(42)
+        get_order(7)
+    with tool_session("bruno"):
+        get_order(42)
+        add_item(42, "Calabresa")
+    with tool_session("ana"):
+        get_order(42)
+        get_order(7)
+
+    assert calls.count(("get_order", 42)) == 3
+    assert calls.count(("get_order", 7)) == 1
+    assert tool_cache.stats()["tools"]["test_get_order"]["invalidations"] == 2
+
+
+def test_nothing_is_memoized_outside_a_session(order_tools):
+    get_order, _, calls = order_tools
+
+    get_order(42)
+    get_order(42)
+
+    assert len(calls) == 2
+    assert tool_cache.stats()["entries"] == 0
+
+
+def test_errors_are_not_memoized():
+    calls = []
+
+    @tool_register(name="test_flaky", cache_ttl=60)
+    def flaky(sabor: str):
+        calls.append(sabor)
+        return {"erro": "indisponível"} if len(calls) == 1 else {"sabor": sabor}
+
+    try:
+        with tool_session("ana"):
+            assert "erro" in TOOLS_REGISTRY["test_flaky"].entrypoint("Calabresa")
+            assert TOOLS_REGISTRY["test_flaky"].entrypoint("Calabresa") == {"sabor": "Calabresa"}
+            assert TOOLS_REGISTRY["test_flaky"].entrypoint("Calabresa") == {"sabor": "Calabresa"}
+        assert len(calls) == 2
+    finally:
+        tool_cache.clear()
+        del TOOLS_REGISTRY["test_flaky"]
+
+
+def test_entries_expire_and_oldest_are_evicted(monkeypatch):
+    now = [100.0]
+    # O pacote agent expõe a instância tool_cache com o mesmo nome do módulo
+    monkeypatch.setattr(sys.modules["agent.tool_cache"], "time", SimpleNamespace(monotonic=lambda: now[0]))
+    cache = ToolResultCache(max_entries=2)
+
+    cache.put(("s", "get_menu", 1), "a", ttl=10)
+    cache.put(("s", "get_menu", 2), "b", ttl=10)
+    assert cache.get("get_menu", ("s", "get_menu", 1)) == (True, "a")
+
+    # A entrada 1 acabou de ser usada: sai a 2, a menos recente
+    cache.put(("s", "get_menu", 3), "c", ttl=10)
+    assert cache.get("get_menu", ("s", "get_menu", 2)) == (False, None)
+
+    now[0] += 11
+    assert cache.get("get_menu", ("s", "get_menu", 1)) == (False, None)
+    assert cache.stats()["entries"] == 1
+
+
+def test_invalidate_only_drops_tagged_entries():
+    cache = ToolResultCache()
+    cache.put(("s", "get_order", 1), "pedido 1", ttl=60, tags=(("order_id", "1"),))
+    cache.put(("s", "get_order", 2), "pedido 2", ttl=60, tags=(("order_id", "2"),))
+
+    assert cache.invalidate(("order_id", "1")) == 1
+    assert cache.invalidate(("order_id", "1")) == 0
+    assert cache.get("get_order", ("s", "get_order", 2)) == (True, "pedido 2")